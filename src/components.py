@@ -3,7 +3,6 @@ import streamlit as st
 import uuid
 import time
 from datetime import datetime
-import pandas as pd
 # Make sure to handle imports carefully to avoid circular dependencies
 import data_handler as dh
 from utils import get_star_rating
@@ -13,8 +12,7 @@ from utils import get_star_rating
 # =============================================================================
 
 def add_review_gsheet(rest_id, comment, rating, user, parent_id="root"):
-    """Adds a review to the Google Sheet."""
-    current_rev_df = dh.load_gsheet_data("reviews")
+    """Adds a review to the Google Sheet (append-only, sent by the write-behind queue)."""
     new_rev = {
         "id": str(uuid.uuid4())[:8],
         "rest_id": rest_id,
@@ -24,8 +22,7 @@ def add_review_gsheet(rest_id, comment, rating, user, parent_id="root"):
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M"),
         "user": user
     }
-    updated_rev_df = pd.concat([current_rev_df, pd.DataFrame([new_rev])], ignore_index=True)
-    dh.save_gsheet_data(updated_rev_df, "reviews")
+    dh.append_gsheet_row(new_rev, "reviews")
     st.success("등록되었습니다!")
     time.sleep(0.5)
     st.rerun()
@@ -2,157 +2,512 @@
 import streamlit as st
 import pandas as pd
 from streamlit_gsheets import GSheetsConnection
-import pymysql
-from login import execute_query, fetch_query
+from db_pool import get_pool, unit_of_work, PoolConnectionError, PoolTimeoutError
+import geo_index
+import geocoding
+import gsheet_queue
+import search_index
+import price_index
 import uuid
-from datetime import datetime
-from urllib.parse import urlparse # [수정] 임포트 추가
+import threading
+import time
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import NamedTuple
 
 # Google Sheets 연결 (기존 코드)
 conn_gsheet = st.connection("gsheets", type=GSheetsConnection)
 
 def load_gsheet_data(worksheet_name):
+    """시트 내용 + 아직 시트에 반영되지 않은 대기열의 행"""
     try:
         df = conn_gsheet.read(worksheet=worksheet_name, ttl=0)
-        if df is None or df.empty: raise ValueError
-        if worksheet_name == "restaurants":
-            df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
-            df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
-        else:
-            df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
-        return df
-    except:
-        if worksheet_name == "restaurants":
-            return pd.DataFrame(columns=["id", "name", "category", "address", "url", "lat", "lon"])
-        else:
-            return pd.DataFrame(columns=["id", "rest_id", "parent_id", "rating", "comment", "timestamp", "user"])
-
-def save_gsheet_data(df, worksheet_name):
-    conn_gsheet.update(worksheet=worksheet_name, data=df)
-    st.cache_data.clear()
+        if df is None or df.empty:
+            df = pd.DataFrame(columns=gsheet_queue.COLUMNS[worksheet_name])
+    except Exception:
+        df = pd.DataFrame(columns=gsheet_queue.COLUMNS[worksheet_name])
+
+    df = gsheet_queue.merge_pending(df, worksheet_name)
+    if worksheet_name == "restaurants":
+        df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+        df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
+    else:
+        df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+    return df
+
+def append_gsheet_row(row, worksheet_name):
+    """
+    시트에 행 하나를 추가합니다 (시트 전체를 다시 쓰지 않음).
+    쓰기 대기열에 넣고 바로 반환하며, 몇 초 안에 다른 세션의 행과 함께 전송됩니다.
+    """
+    gsheet_queue.enqueue(worksheet_name, row)
 
 
 # =============================================================================
 # MySQL 데이터베이스 연결 및 유틸리티 함수
 # =============================================================================
 
-def get_db_connection():
-    """데이터베이스 연결 함수 (pymysql 전용)"""
-    try:
-        mysql_config = st.secrets["connections"]["mysql"]
-        url = mysql_config["url"]
-        
-        # [수정] urllib를 사용하여 안전하게 파싱
-        parsed = urlparse(url)
-        
-        host = parsed.hostname
-        port = parsed.port or 3306
-        user = parsed.username
-        password = parsed.password
-        database = parsed.path.lstrip("/")
-        
-        conn = pymysql.connect(
-            host=host,
-            port=port,
-            user=user,
-            password=password,
-            database=database,
-            charset='utf8mb4'
-        )
-        return conn
-    except Exception as e:
-        st.error(f"데이터베이스 연결 실패: {e}")
-        return None
-
 def execute_query(query, params=None):
-    """쿼리 실행 함수 (INSERT, UPDATE, DELETE)"""
-    conn = get_db_connection()
-    if conn is None:
-        return False
+    """쿼리 실행 함수 (INSERT, UPDATE, DELETE) - 공유 커넥션 풀 사용"""
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+            conn.commit()
         return True
+    except (PoolConnectionError, PoolTimeoutError) as e:
+        st.error(f"데이터베이스 연결 실패: {e}")
+        return False
     except Exception as e:
         st.error(f"쿼리 실행 실패: {e}")
-        conn.close()
         return False
 
 def fetch_query(query, params=None):
     """쿼리 결과 반환 함수 (SELECT) - DataFrame으로 반환"""
-    conn = get_db_connection()
-    if conn is None:
-        return pd.DataFrame()
     try:
-        df = pd.read_sql(query, conn, params=params)
-        conn.close()
-        return df
+        with get_pool().connection() as conn:
+            return pd.read_sql(query, conn, params=params)
+    except (PoolConnectionError, PoolTimeoutError) as e:
+        st.error(f"데이터베이스 연결 실패: {e}")
+        return pd.DataFrame()
     except Exception as e:
         st.error(f"쿼리 실행 실패: {e}")
-        conn.close()
         return pd.DataFrame()
 
 
 # =============================================================================
-# 사용자 관리 함수
+# 메인 데이터 조회 함수
 # =============================================================================
 
-def get_or_create_user(name, email):
+JOINED_SELECT = """
+    SELECT 
+        r.id as restaurant_id,
+        r.name as restaurant_name,
+        r.category,
+        r.address,
+        r.lat,
+        r.lon,
+        r.geohash,
+        r.url,
+        mi.id as menu_item_id,
+        mi.item_name,
+        mi.price,
+        mr.id as review_id,
+        mr.rating,
+        mr.comment,
+        mr.timestamp,
+        u.name as user_name,
+        r.added_at as restaurant_added_at,
+        mi.added_at as menu_added_at
+"""
+
+# 증분 조회: 워터마크 이후에 추가된 리뷰 / 메뉴 / 맛집이 포함된 행만 가져옵니다.
+# 각 분기가 자기 테이블의 시간 컬럼 하나만 범위 조건으로 거르도록 UNION ALL로 나눴습니다.
+JOINED_DELTA_QUERY = JOINED_SELECT + """
+    FROM menu_reviews mr
+    JOIN menu_items mi ON mr.menu_item_id = mi.id
+    JOIN restaurants r ON mi.restaurant_id = r.id
+    LEFT JOIN users u ON mr.user_id = u.id
+    WHERE mr.timestamp >= %s
+    UNION ALL
+""" + JOINED_SELECT + """
+    FROM menu_items mi
+    JOIN restaurants r ON mi.restaurant_id = r.id
+    LEFT JOIN menu_reviews mr ON mi.id = mr.menu_item_id
+    LEFT JOIN users u ON mr.user_id = u.id
+    WHERE mi.added_at >= %s
+    UNION ALL
+""" + JOINED_SELECT + """
+    FROM restaurants r
+    LEFT JOIN menu_items mi ON r.id = mi.restaurant_id
+    LEFT JOIN menu_reviews mr ON mi.id = mr.menu_item_id
+    LEFT JOIN users u ON mr.user_id = u.id
+    WHERE r.added_at >= %s
+"""
+
+JOINED_KEY_COLUMNS = ["restaurant_id", "menu_item_id", "review_id"]
+JOINED_TIME_COLUMNS = ["timestamp", "menu_added_at", "restaurant_added_at"]
+
+# 커밋이 늦게 끝난 트랜잭션의 행을 놓치지 않도록 워터마크보다 조금 앞에서부터 조회
+WATERMARK_OVERLAP = timedelta(seconds=60)
+
+
+class JoinedDataCache:
+    """get_all_data_joined 결과를 프로세스 전체에서 공유하는 캐시"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.df = None
+        self.keys = set()
+        self.watermark = None
+        self.version = 0
+        self.review_index = {}
+        self.review_index_version = None
+        self.search_index = None  # 첫 검색 때 만들고, 이후에는 새 행만 추가 색인
+        self.price_index = None
+        self.price_index_version = None
+        self.refreshed_at = 0.0  # 마지막으로 변경분을 확인한 시각 (time.monotonic)
+        # 화면 캐시용 데이터 버전 (get_data_version) - 조인 캐시를 읽지 않고 테이블별 마지막 추가 시각으로 판단
+        self.marks = None
+        self.marks_checked_at = 0.0
+        self.local_changes = 0  # 좌표 채우기처럼 추가 시각이 바뀌지 않는 변경 횟수
+
+
+@st.cache_resource(show_spinner=False)
+def _get_joined_cache():
+    return JoinedDataCache()
+
+
+def _row_keys(df):
+    """(restaurant_id, menu_item_id, review_id) 키 집합 (NaN은 None으로 통일)"""
+    keys = df[JOINED_KEY_COLUMNS].astype(object)
+    keys = keys.where(keys.notna(), None)
+    return set(keys.itertuples(index=False, name=None))
+
+
+def _max_timestamp(df):
+    values = [pd.to_datetime(df[col], errors="coerce").max() for col in JOINED_TIME_COLUMNS]
+    values = [v for v in values if pd.notna(v)]
+    return max(values) if values else None
+
+
+def _drop_placeholder_rows(df):
     """
-    이름으로 사용자를 찾거나 새로 생성합니다.
-    사용자 ID를 반환합니다.
+    LEFT JOIN으로 생긴 빈 행(메뉴 없는 맛집, 리뷰 없는 메뉴) 중
+    이제 실제 데이터가 생긴 것들은 제거합니다.
     """
-    user_df = fetch_query("SELECT id FROM users WHERE name = %s", params=(name,))
-    if not user_df.empty:
-        return user_df.iloc[0]['id']
-    else:
-        user_id = str(uuid.uuid4())[:8]
-        execute_query(
-            "INSERT INTO users (id, name, email, joined_at) VALUES (%s, %s, %s, NOW())",
-            params=(user_id, name, email)
-        )
-        return user_id
+    has_menu = df["menu_item_id"].notna()
+    rests_with_menu = set(df.loc[has_menu, "restaurant_id"])
+    df = df[has_menu | ~df["restaurant_id"].isin(rests_with_menu)]
 
+    has_review = df["review_id"].notna()
+    menus_with_review = set(df.loc[has_review, "menu_item_id"])
+    return df[has_review | ~df["menu_item_id"].isin(menus_with_review)]
+
+
+def _normalize_joined(df):
+    if not df.empty:
+        df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+        df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+        df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
+    return df
+
+
+def _refresh_joined_cache(cache):
+    """워터마크 이후 변경분만 가져와 캐시에 합칩니다. (없으면 전체 로드)"""
+    cache.refreshed_at = time.monotonic()
+    if cache.df is None:
+        df = fetch_query(JOINED_SELECT + """
+            FROM restaurants r
+            LEFT JOIN menu_items mi ON r.id = mi.restaurant_id
+            LEFT JOIN menu_reviews mr ON mi.id = mr.menu_item_id
+            LEFT JOIN users u ON mr.user_id = u.id
+        """)
+        if df.empty and len(df.columns) == 0:
+            return  # 조회 실패 - 다음 rerun에서 다시 시도
+        cache.df = _normalize_joined(df)
+        cache.keys = _row_keys(cache.df)
+        cache.watermark = _max_timestamp(cache.df)
+        cache.version += 1
+        cache.search_index = None
+        return
+
+    since = (cache.watermark - WATERMARK_OVERLAP) if cache.watermark is not None else datetime(1970, 1, 1)
+    since = pd.Timestamp(since).to_pydatetime()
+    delta = fetch_query(JOINED_DELTA_QUERY, params=(since, since, since))
+    if delta.empty:
+        return
+
+    delta_max = _max_timestamp(delta)
+    if delta_max is not None and (cache.watermark is None or delta_max > cache.watermark):
+        cache.watermark = delta_max
+
+    # 겹쳐서 다시 읽은 행뿐이면 캐시를 건드리지 않음
+    if not (_row_keys(delta) - cache.keys):
+        return
+
+    delta = _normalize_joined(delta)
+    merged = pd.concat([cache.df, delta], ignore_index=True)
+    merged = merged.drop_duplicates(subset=JOINED_KEY_COLUMNS, keep="last")
+    cache.df = _drop_placeholder_rows(merged).reset_index(drop=True)
+    cache.keys = _row_keys(cache.df)
+    cache.version += 1
+    if cache.search_index is not None:
+        cache.search_index.add_rows(delta)
 
-# =============================================================================
-# 메인 데이터 조회 함수
-# =============================================================================
 
 def get_all_data_joined():
     """
     restaurants, menu_items, menu_reviews, users를 조인하여
     종합적인 DataFrame을 반환합니다.
+
+    결과는 프로세스 단위로 캐시되며, 매 rerun마다 마지막 워터마크 이후에
+    추가된 행만 조회해서 합칩니다. (반환된 DataFrame은 공유되므로 수정하지 마세요)
     """
-    query = """
-        SELECT 
-            r.id as restaurant_id,
-            r.name as restaurant_name,
-            r.category,
-            r.address,
-            r.lat,
-            r.lon,
-            r.url,
-            mi.item_name,
-            mi.price,
-            mr.rating,
-            mr.comment,
-            mr.timestamp,
-            u.name as user_name
-        FROM restaurants r
-        LEFT JOIN menu_items mi ON r.id = mi.restaurant_id
-        LEFT JOIN menu_reviews mr ON mi.id = mr.menu_item_id
-        LEFT JOIN users u ON mr.user_id = u.id
+    cache = _get_joined_cache()
+    with cache.lock:
+        _refresh_joined_cache(cache)
+        if cache.df is None:
+            return pd.DataFrame()
+        return cache.df
+
+
+DATA_VERSION_CHECK_INTERVAL = 2  # 초 - 여러 세션이 rerun해도 버전 확인 쿼리는 이 간격에 한 번만
+
+
+def _fetch_data_marks():
+    """테이블별 마지막 추가 시각 (시간 컬럼 인덱스의 끝 값만 읽으므로 데이터 양과 무관). 실패 시 None"""
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT (SELECT MAX(added_at) FROM restaurants),
+                           (SELECT MAX(added_at) FROM menu_items),
+                           (SELECT MAX(timestamp) FROM menu_reviews)
+                    """
+                )
+                return cursor.fetchone()
+    except Exception:
+        return None
+
+
+def get_data_version(max_age=DATA_VERSION_CHECK_INTERVAL):
+    """
+    카드 목록 / 지도 캐시 키로 쓰는 데이터 버전 (맛집·메뉴·리뷰가 추가되면 바뀜).
+    전체 조인 데이터를 읽지 않고 max_age초에 한 번 테이블별 마지막 추가 시각만 확인합니다.
+    """
+    cache = _get_joined_cache()
+    with cache.lock:
+        if time.monotonic() - cache.marks_checked_at > max_age:
+            marks = _fetch_data_marks()
+            if marks is not None:
+                cache.marks = tuple(marks)
+            cache.marks_checked_at = time.monotonic()
+        return cache.marks, cache.local_changes
+
+
+def _mark_data_changed():
+    """이 프로세스에서 쓴 변경은 다음 조회 때 바로 보이도록 버전 확인 주기를 건너뜀"""
+    cache = _get_joined_cache()
+    with cache.lock:
+        cache.marks_checked_at = 0.0
+
+
+REVIEW_INDEX_COLUMNS = ["item_name", "price", "user_name", "rating", "comment", "timestamp"]
+
+
+def build_review_index(df):
+    """
+    조인 DataFrame을 한 번만 훑어서 맛집별 리뷰 인덱스를 만듭니다.
+
+    Returns:
+        dict: restaurant_id -> {
+            "reviews": 최신순으로 정렬된 리뷰 dict 리스트 (time_str 포함),
+            "review_count": 리뷰 수,
+            "avg_rating": 평균 별점,
+        }
+    """
+    if df is None or df.empty:
+        return {}
+
+    reviews = df.dropna(subset=['timestamp'])
+    if reviews.empty:
+        return {}
+
+    reviews = reviews.sort_values('timestamp', ascending=False, kind='stable')
+    records = reviews[REVIEW_INDEX_COLUMNS].copy()
+    records['time_str'] = pd.to_datetime(records['timestamp']).dt.strftime('%Y-%m-%d %H:%M')
+
+    aggregates = reviews.groupby('restaurant_id', sort=False)['rating'].agg(['count', 'mean'])
+
+    index = {}
+    for rest_id, positions in reviews.groupby('restaurant_id', sort=False).indices.items():
+        index[rest_id] = {
+            "reviews": records.iloc[positions].to_dict("records"),
+            "review_count": int(aggregates.at[rest_id, 'count']),
+            "avg_rating": float(aggregates.at[rest_id, 'mean']),
+        }
+    return index
+
+
+def get_review_index():
+    """현재 데이터 버전의 맛집별 리뷰 인덱스 (버전이 바뀔 때만 다시 만듦)"""
+    cache = _get_joined_cache()
+    with cache.lock:
+        if cache.review_index_version != cache.version:
+            cache.review_index = build_review_index(cache.df)
+            cache.review_index_version = cache.version
+        return cache.review_index
+
+
+def search(query, limit=search_index.DEFAULT_LIMIT):
     """
-    return fetch_query(query)
+    맛집 이름 / 메뉴 이름 / 리뷰 내용 통합 검색 (메모리 역색인, DB 조회 없음)
+
+    Returns:
+        list[dict]: kind(restaurant/menu/review), restaurant_id, restaurant_name, text, score ...
+    """
+    cache = _get_joined_cache()
+    with cache.lock:
+        _refresh_joined_cache(cache)
+        if cache.search_index is None:
+            cache.search_index = search_index.build_index(cache.df)
+        index = cache.search_index
+    return index.search(query, limit=limit)
+
+
+PRICE_INDEX_MAX_AGE = 30  # 초 - 이 시간 안에는 변경분 확인 쿼리도 보내지 않음
+
+
+def get_price_index(max_age=PRICE_INDEX_MAX_AGE):
+    """
+    가격순 메뉴 카탈로그 (price_index.PriceIndex).
+    변경분 확인은 max_age초에 한 번만 하고, 데이터 버전이 바뀔 때만 다시 만듭니다.
+    """
+    cache = _get_joined_cache()
+    with cache.lock:
+        if cache.df is None or time.monotonic() - cache.refreshed_at > max_age:
+            _refresh_joined_cache(cache)
+        if cache.price_index_version != cache.version:
+            cache.price_index = price_index.build_price_index(cache.df)
+            cache.price_index_version = cache.version
+        return cache.price_index
+
+
+def invalidate_joined_cache():
+    """조인 캐시를 비웁니다. 다음 get_all_data_joined 호출 때 전체를 다시 읽습니다."""
+    cache = _get_joined_cache()
+    with cache.lock:
+        cache.df = None
+        cache.keys = set()
+        cache.watermark = None
+        cache.local_changes += 1
 
 
 # =============================================================================
 # 데이터 저장 함수
 # =============================================================================
 
+class VisitRegistrationError(Exception):
+    """방문 기록을 저장할 수 없을 때 발생 (사용자에게 보여줄 메시지 포함)"""
+
+
+def register_visit(
+    user_name, user_email,
+    rest_name, rest_address, rest_category, rest_url,
+    menu_name, menu_price,
+    review_rating, review_comment,
+):
+    """
+    사용자, 맛집, 메뉴, 리뷰를 하나의 커넥션 / 하나의 트랜잭션으로 저장합니다.
+    중간에 실패하면 전부 롤백되어 고아 행이 남지 않습니다.
+
+    지오코더(Nominatim)는 호출하지 않습니다. 새 맛집일 때만 geocode_cache를 함께 읽고,
+    캐시에 없으면 좌표 없이 넣은 뒤 백그라운드 backfill이 채웁니다.
+    - 왕복 1: BEGIN + 맛집 존재 여부 / (새 맛집이면) 주소 캐시 조회
+    - 왕복 2: 사용자/맛집 '없을 때만 INSERT' + 메뉴/리뷰/요약 INSERT + COMMIT
+    (등록 중 DB 호출은 이 커넥션의 두 번뿐이며 round_trips에 모두 기록됨)
+
+    Returns:
+        (int, bool): (DB 왕복 횟수, 좌표를 백그라운드에서 채워야 하는지)
+    """
+    menu_item_id = str(uuid.uuid4())[:8]
+    review_id = str(uuid.uuid4())[:8]
+    pending_geocode = False
+
+    with unit_of_work() as uow:
+        # 1. 맛집 조회 - 없는 맛집이면 같은 쿼리에서 주소 캐시(geocode_cache)도 함께 읽음
+        row = uow.fetch_one(
+            """
+            SELECT r.id AS rest_id, gc.lat, gc.lon, gc.status,
+                   TIMESTAMPDIFF(SECOND, gc.updated_at, NOW()) AS age
+            FROM (SELECT 1) AS one
+            LEFT JOIN restaurants r ON r.name = %s AND r.address = %s
+            LEFT JOIN geocode_cache gc ON r.id IS NULL AND gc.address_key = %s
+            LIMIT 1
+            """,
+            (rest_name, rest_address, geocoding.address_key(rest_address))
+        )
+        is_new = row["rest_id"] is None
+        if is_new:
+            # 새 맛집: '못 찾음'으로 남은 주소는 거절하고, 캐시에 없으면 좌표 없이 넣은 뒤 백그라운드에서 채움
+            cached, coords = geocoding.cached_result(row if row["status"] else None)
+            if cached and coords is None:
+                raise VisitRegistrationError("주소를 좌표로 변환할 수 없습니다. 주소를 다시 확인해 주세요.")
+
+        # 2. 사용자: 이름이 없을 때만 생성
+        uow.add(
+            """
+            INSERT INTO users (id, name, email, joined_at)
+            SELECT %s, %s, %s, NOW() FROM DUAL
+            WHERE NOT EXISTS (SELECT 1 FROM users WHERE name = %s)
+            """,
+            (str(uuid.uuid4())[:8], user_name, user_email, user_name)
+        )
+
+        # 3. 맛집: 새 맛집이면 '없을 때만' 생성 (동시 등록 대비)
+        if is_new:
+            lat, lon = coords if coords else (None, None)
+            geohash = geo_index.encode(lat, lon) if coords else None
+            pending_geocode = coords is None
+
+            uow.add(
+                """
+                INSERT INTO restaurants (id, name, category, address, lat, lon, geohash, url, added_at)
+                SELECT %s, %s, %s, %s, %s, %s, %s, %s, NOW() FROM DUAL
+                WHERE NOT EXISTS (SELECT 1 FROM restaurants WHERE name = %s AND address = %s)
+                """,
+                (str(uuid.uuid4())[:8], rest_name, rest_category, rest_address, lat, lon,
+                 geohash, rest_url, rest_name, rest_address)
+            )
+
+        # 4. 메뉴 아이템 생성 (맛집 ID는 DB에서 바로 찾음)
+        uow.add(
+            """
+            INSERT INTO menu_items (id, restaurant_id, item_name, price, added_at)
+            SELECT %s, r.id, %s, %s, NOW()
+            FROM restaurants r
+            WHERE r.name = %s AND r.address = %s
+            LIMIT 1
+            """,
+            (menu_item_id, menu_name, menu_price, rest_name, rest_address)
+        )
+
+        # 5. 메뉴 리뷰 생성 (사용자 ID도 DB에서 바로 찾음)
+        uow.add(
+            """
+            INSERT INTO menu_reviews (id, menu_item_id, user_id, rating, comment, timestamp)
+            SELECT %s, %s, u.id, %s, %s, NOW()
+            FROM users u
+            WHERE u.name = %s
+            LIMIT 1
+            """,
+            (review_id, menu_item_id, review_rating, review_comment, user_name)
+        )
+
+        # 6. 맛집 요약(restaurant_stats) 갱신 - 같은 트랜잭션 안에서 증분 반영
+        uow.add(
+            """
+            INSERT INTO restaurant_stats
+                (restaurant_id, review_count, rating_sum, avg_rating, menu_count, last_review_at)
+            SELECT r.id, 1, %s, %s, 1, NOW()
+            FROM restaurants r
+            WHERE r.name = %s AND r.address = %s
+            LIMIT 1
+            ON DUPLICATE KEY UPDATE
+                review_count = review_count + 1,
+                rating_sum = rating_sum + VALUES(rating_sum),
+                avg_rating = rating_sum / review_count,
+                menu_count = menu_count + 1,
+                last_review_at = VALUES(last_review_at)
+            """,
+            (review_rating, review_rating, rest_name, rest_address)
+        )
+
+    return uow.round_trips, pending_geocode
+
+
 def save_full_visit_data(
     user_name, user_email, 
     rest_name, rest_address, rest_category, rest_url, 
@@ -162,73 +517,249 @@ def save_full_visit_data(
     """
     사용자, 맛집, 메뉴, 리뷰를 한 번에 처리하여 저장합니다.
     """
-    # 1. 사용자 가져오기 또는 생성
-    user_id = get_or_create_user(user_name, user_email)
-
-    # 2. 맛집 가져오기 또는 생성
-    rest_df = fetch_query(
-        "SELECT id FROM restaurants WHERE name = %s AND address = %s",
-        params=(rest_name, rest_address)
-    )
-    
-    if not rest_df.empty:
-        rest_id = rest_df.iloc[0]['id']
-    else:
-        # 주소로 좌표 가져오기
-        from utils import get_coords
-        lat, lon = get_coords(rest_address)
-        if not lat:
-            st.error("주소를 좌표로 변환할 수 없습니다.")
-            return
-        
-        rest_id = str(uuid.uuid4())[:8]
-        execute_query(
-            """
-            INSERT INTO restaurants (id, name, category, address, lat, lon, url, added_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
-            """,
-            params=(rest_id, rest_name, rest_category, rest_address, lat, lon, rest_url)
+    try:
+        round_trips, pending_geocode = register_visit(
+            user_name, user_email,
+            rest_name, rest_address, rest_category, rest_url,
+            menu_name, menu_price,
+            review_rating, review_comment
         )
+    except VisitRegistrationError as e:
+        st.error(str(e))
+        return
+    except (PoolConnectionError, PoolTimeoutError) as e:
+        st.error(f"데이터베이스 연결 실패: {e}")
+        return
+    except Exception as e:
+        st.error(f"리뷰 저장 실패 (모든 변경이 취소되었습니다): {e}")
+        return
 
-    # 3. 메뉴 아이템 생성
-    menu_item_id = str(uuid.uuid4())[:8]
-    execute_query(
-        """
-        INSERT INTO menu_items (id, restaurant_id, item_name, price, added_at)
-        VALUES (%s, %s, %s, %s, NOW())
-        """,
-        params=(menu_item_id, rest_id, menu_name, menu_price)
-    )
-
-    # 4. 메뉴 리뷰 생성
-    review_id = str(uuid.uuid4())[:8]
-    execute_query(
-        """
-        INSERT INTO menu_reviews (id, menu_item_id, user_id, rating, comment, timestamp)
-        VALUES (%s, %s, %s, %s, %s, NOW())
-        """,
-        params=(review_id, menu_item_id, user_id, review_rating, review_comment)
-    )
-    
-    st.success("리뷰가 성공적으로 등록되었습니다!")
+    # st.rerun() 이후에도 보이도록 toast 사용
+    st.toast(f"리뷰가 성공적으로 등록되었습니다! (DB 왕복 {round_trips}회)", icon="✅")
+    _mark_data_changed()
+    if pending_geocode:
+        geocoding.start_background_backfill()
+        st.toast("📍 가게 위치는 잠시 후 지도에 반영됩니다.")
     st.cache_data.clear()  # 캐시 초기화
     st.rerun()
 
 
+# =============================================================================
+# 맛집 목록 (카드 그리드용 페이지 조회)
+# =============================================================================
+
+# 정렬 키: (SQL 정렬식, 방향)
+LISTING_SORTS = {
+    "latest": ("COALESCE(r.added_at, '1970-01-01')", "DESC"),
+    "rating": ("COALESCE(s.avg_rating, 0)", "DESC"),
+    "reviews": ("COALESCE(s.review_count, 0)", "DESC"),
+    "name": ("r.name", "ASC"),
+}
+
+def list_restaurants(category=None, sort="latest", page_size=12, cursor=None):
+    """
+    카드 그리드용 맛집 목록을 한 페이지씩 가져옵니다.
+    카테고리 필터 / 정렬 / 페이지 나누기를 SQL에서 처리하고,
+    카드에 필요한 컬럼만 가져옵니다 (리뷰 본문 제외).
+
+    Args:
+        category: 카테고리 ("전체" 또는 None이면 필터 없음)
+        sort: LISTING_SORTS의 키
+        page_size: 한 페이지 맛집 수
+        cursor: 이전 호출이 돌려준 next_cursor (키셋 페이지네이션)
+
+    Returns:
+        (DataFrame, next_cursor): 다음 페이지가 없으면 next_cursor는 None
+    """
+    sort_expr, direction = LISTING_SORTS[sort]
+    op = "<" if direction == "DESC" else ">"
+
+    conditions, params = [], []
+    if category and category != "전체":
+        conditions.append("r.category = %s")
+        params.append(category)
+    if cursor is not None:
+        sort_value, last_id = cursor
+        conditions.append(f"({sort_expr} {op} %s OR ({sort_expr} = %s AND r.id > %s))")
+        params.extend([sort_value, sort_value, last_id])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        SELECT
+            r.id AS restaurant_id,
+            r.name AS restaurant_name,
+            r.category,
+            r.address,
+            r.url,
+            s.avg_rating,
+            COALESCE(s.review_count, 0) AS review_count,
+            {sort_expr} AS sort_key
+        FROM restaurants r
+        LEFT JOIN restaurant_stats s ON s.restaurant_id = r.id
+        {where}
+        ORDER BY sort_key {direction}, r.id ASC
+        LIMIT %s
+    """
+    params.append(page_size + 1)  # 한 개 더 가져와서 다음 페이지 유무 확인
+
+    df = fetch_query(query, params=tuple(params))
+    if df.empty:
+        return df, None
+
+    df['avg_rating'] = pd.to_numeric(df['avg_rating'], errors='coerce')
+    next_cursor = None
+    if len(df) > page_size:
+        df = df.iloc[:page_size]
+        last = df.iloc[-1]
+        sort_value = last['sort_key']
+        if isinstance(sort_value, pd.Timestamp):
+            sort_value = sort_value.to_pydatetime()
+        elif hasattr(sort_value, "item"):
+            sort_value = sort_value.item()
+        next_cursor = (sort_value, last['restaurant_id'])
+    return df.drop(columns=['sort_key']), next_cursor
+
+
 # =============================================================================
 # 기타 조회 함수들 (필요시 사용)
 # =============================================================================
 
-@st.cache_data(ttl=60)
-def get_all_restaurants():
-    """모든 맛집 데이터를 가져오는 함수"""
-    query = "SELECT id, name, category, address, url, lat, lon FROM restaurants;"
-    df = fetch_query(query)
+def get_restaurants_in_bbox(south, west, north, east):
+    """
+    위경도 박스 안의 맛집만 가져옵니다 (지도 마커용 최소 컬럼).
+    (lat, lon) 인덱스를 타도록 두 컬럼 모두 범위 조건으로 거릅니다.
+    """
+    query = """
+        SELECT id AS restaurant_id, name AS restaurant_name, category, lat, lon
+        FROM restaurants
+        WHERE lat BETWEEN %s AND %s
+          AND lon BETWEEN %s AND %s
+    """
+    df = fetch_query(query, params=(south, north, west, east))
+    if not df.empty:
+        df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+        df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
+    return df
+
+@st.cache_data(ttl=600, show_spinner=False)
+def get_map_center(data_version):
+    """좌표가 있는 맛집의 평균 위치 (lat, lon 한 행 DataFrame - 좌표가 하나도 없으면 NaN)"""
+    df = fetch_query("SELECT AVG(lat) AS lat, AVG(lon) AS lon FROM restaurants WHERE lat IS NOT NULL")
+    if df.empty:
+        return pd.DataFrame({"lat": [None], "lon": [None]})
+    return df
+
+@st.cache_data(ttl=600, show_spinner=False, max_entries=16)
+def get_map_points(category, data_version):
+    """클러스터 / WebGL 지도용 맛집 좌표 (지도 마커용 최소 컬럼, 좌표 없는 맛집 제외)"""
+    query = """
+        SELECT id AS restaurant_id, name AS restaurant_name, category, lat, lon
+        FROM restaurants
+        WHERE lat IS NOT NULL AND lon IS NOT NULL
+    """
+    params = None
+    if category and category != "전체":
+        query += " AND category = %s"
+        params = (category,)
+    df = fetch_query(query, params=params)
     if not df.empty:
         df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
         df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
     return df
 
+@st.cache_data(ttl=60, show_spinner=False)
+def get_restaurant_names():
+    """맛집 선택 목록용 (id, name)"""
+    return fetch_query("SELECT id, name FROM restaurants ORDER BY name")
+
+def get_daily_ratings(restaurant_ids):
+    """선택한 맛집들의 날짜별 평균 별점 (DB에서 집계)"""
+    if not restaurant_ids:
+        return pd.DataFrame(columns=["date", "restaurant_name", "rating"])
+    placeholders = ", ".join(["%s"] * len(restaurant_ids))
+    query = f"""
+        SELECT DATE(mr.timestamp) AS date, r.name AS restaurant_name, AVG(mr.rating) AS rating
+        FROM menu_reviews mr
+        JOIN menu_items mi ON mr.menu_item_id = mi.id
+        JOIN restaurants r ON mi.restaurant_id = r.id
+        WHERE r.id IN ({placeholders}) AND mr.timestamp IS NOT NULL AND mr.rating IS NOT NULL
+        GROUP BY DATE(mr.timestamp), r.id, r.name
+        ORDER BY date
+    """
+    df = fetch_query(query, params=tuple(restaurant_ids))
+    if not df.empty:
+        df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+    return df
+
+def backfill_geohash():
+    """좌표는 있는데 geohash가 비어 있는 맛집을 채웁니다. 채운 맛집 수를 반환"""
+    df = fetch_query(
+        "SELECT id, lat, lon FROM restaurants WHERE geohash IS NULL AND lat IS NOT NULL AND lon IS NOT NULL"
+    )
+    if df.empty:
+        return 0
+
+    df['geohash'] = geo_index.fill_geohash(df)
+    with unit_of_work() as uow:
+        for rest_id, gh in zip(df['id'], df['geohash']):
+            uow.add("UPDATE restaurants SET geohash = %s WHERE id = %s", (gh, rest_id))
+    return len(df)
+
+@st.cache_data(ttl=60)
+def get_restaurant_stats():
+    """맛집 요약(restaurant_stats)을 restaurant_id 인덱스의 DataFrame으로 반환"""
+    query = """
+        SELECT restaurant_id, review_count, rating_sum, avg_rating, menu_count, last_review_at
+        FROM restaurant_stats
+    """
+    df = fetch_query(query)
+    if df.empty:
+        df = pd.DataFrame(columns=["restaurant_id", "review_count", "rating_sum",
+                                   "avg_rating", "menu_count", "last_review_at"])
+    df['avg_rating'] = pd.to_numeric(df['avg_rating'], errors='coerce')
+    return df.set_index('restaurant_id')
+
+def rebuild_restaurant_stats():
+    """
+    restaurant_stats를 원본 테이블에서 다시 계산합니다.
+    (요약이 어긋났거나 처음 도입할 때 사용) 반영된 맛집 수를 반환합니다.
+    """
+    with unit_of_work() as uow:
+        uow.add("DELETE FROM restaurant_stats WHERE restaurant_id NOT IN (SELECT id FROM restaurants)")
+        uow.add(
+            """
+            REPLACE INTO restaurant_stats
+                (restaurant_id, review_count, rating_sum, avg_rating, menu_count, last_review_at)
+            SELECT
+                r.id,
+                COALESCE(rv.review_count, 0),
+                COALESCE(rv.rating_sum, 0),
+                rv.avg_rating,
+                COALESCE(mc.menu_count, 0),
+                rv.last_review_at
+            FROM restaurants r
+            LEFT JOIN (
+                SELECT restaurant_id, COUNT(*) AS menu_count
+                FROM menu_items
+                GROUP BY restaurant_id
+            ) mc ON mc.restaurant_id = r.id
+            LEFT JOIN (
+                SELECT
+                    mi.restaurant_id,
+                    COUNT(*) AS review_count,
+                    SUM(mr.rating) AS rating_sum,
+                    AVG(mr.rating) AS avg_rating,
+                    MAX(mr.timestamp) AS last_review_at
+                FROM menu_reviews mr
+                JOIN menu_items mi ON mr.menu_item_id = mi.id
+                GROUP BY mi.restaurant_id
+            ) rv ON rv.restaurant_id = r.id
+            """
+        )
+        row = uow.fetch_one("SELECT COUNT(*) AS cnt FROM restaurant_stats")
+    st.cache_data.clear()
+    return int(row["cnt"])
+
 def get_reviews_by_restaurant(restaurant_id):
     """특정 맛집의 모든 리뷰를 가져오는 함수"""
     query = """
@@ -249,127 +780,280 @@ def get_reviews_by_restaurant(restaurant_id):
 # Party (맛집 원정대) Functions
 # =============================================================================
 
+# 파티 변경은 parties_version 카운터로 감지하고, 새 맛집 등록(가게 선택 목록)은 이 시간이 지나면 반영
+PARTY_SNAPSHOT_MAX_AGE = 60  # 초
+# 여러 탭이 동시에 폴링해도 버전 조회 쿼리는 프로세스당 이 간격에 한 번만 보냄
+PARTY_VERSION_CHECK_INTERVAL = 2  # 초
+
+# 파티 쓰기 트랜잭션마다 함께 실행 (행이 없으면 만들어 줌)
+BUMP_PARTIES_VERSION = """
+    INSERT INTO parties_version (id, version) VALUES (1, 1)
+    ON DUPLICATE KEY UPDATE version = version + 1
+"""
+
+PARTY_SNAPSHOT_QUERY = """
+    SELECT
+        p.id, p.restaurant_id, r.name AS restaurant_name,
+        p.host_id, h.name AS host_name,
+        p.max_people, p.is_anonymous, p.created_at,
+        pp.user_id AS participant_id, u.name AS participant_name
+    FROM parties p
+    JOIN restaurants r ON p.restaurant_id = r.id
+    JOIN users h ON p.host_id = h.id
+    LEFT JOIN party_participants pp ON pp.party_id = p.id
+    LEFT JOIN users u ON pp.user_id = u.id
+    -- 컬럼에 함수를 씌우지 않고 범위로 비교해야 (status, created_at) 인덱스를 탐
+    WHERE p.status = 'OPEN'
+      AND p.created_at >= CURDATE() AND p.created_at < CURDATE() + INTERVAL 1 DAY
+    ORDER BY p.created_at DESC, pp.joined_at ASC
+"""
+
+PARTY_COLUMNS = ["id", "restaurant_id", "restaurant_name", "host_id", "host_name",
+                 "max_people", "is_anonymous", "created_at"]
+
+
+class PartySnapshot(NamedTuple):
+    """오늘의 원정대 화면에 필요한 데이터 묶음 (세션끼리 공유하므로 읽기 전용으로 사용)"""
+    parties: dict       # party_id -> 파티 정보 dict (current_people 포함, 최신 개설 순)
+    participants: dict  # party_id -> [{"id", "name"}, ...] (입장 순)
+    rest_labels: dict   # "가게 이름 (카테고리)" -> restaurant_id
+    version: int
+
+
+class PartyCache:
+    """파티 스냅샷 캐시. DB의 parties_version이 바뀌었을 때만 스냅샷을 다시 읽습니다."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None          # 마지막으로 확인한 parties_version
+        self.version_checked_at = 0.0  # time.monotonic
+        self.snapshot = None
+        self.loaded_at = 0.0
+        self.loaded_day = None
+
+
+@st.cache_resource(show_spinner=False)
+def _get_party_cache():
+    return PartyCache()
+
+
+def _fetch_parties_version():
+    """parties_version 카운터 값 (테이블이 없거나 조회 실패 시 None) - autocommit 연결에서 SELECT 한 번"""
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT version FROM parties_version WHERE id = 1")
+                row = cursor.fetchone()
+    except Exception:
+        return None
+    return int(row[0]) if row else 0
+
+
+def get_parties_version(max_age=PARTY_VERSION_CHECK_INTERVAL):
+    """
+    파티 데이터 버전 (파티 생성/참여/나가기/수정/삭제마다 1씩 증가).
+    max_age초 안에 이미 확인했다면 DB를 조회하지 않고 마지막 값을 돌려줍니다.
+    """
+    cache = _get_party_cache()
+    with cache.lock:
+        if time.monotonic() - cache.version_checked_at > max_age:
+            cache.version = _fetch_parties_version()
+            cache.version_checked_at = time.monotonic()
+        return cache.version
+
+
+def _mark_party_changed():
+    """이 프로세스에서 쓴 변경은 다음 조회 때 바로 보이도록 버전 확인 주기를 건너뜀"""
+    cache = _get_party_cache()
+    with cache.lock:
+        cache.version_checked_at = 0.0
+
+
+def _execute_party_write(query, params):
+    """파티 쓰기 쿼리와 parties_version 증가를 하나의 트랜잭션으로 실행"""
+    try:
+        with unit_of_work() as uow:
+            uow.add(query, params)
+            uow.add(BUMP_PARTIES_VERSION)
+    except (PoolConnectionError, PoolTimeoutError) as e:
+        st.error(f"데이터베이스 연결 실패: {e}")
+        return False
+    except Exception as e:
+        st.error(f"쿼리 실행 실패: {e}")
+        return False
+    _mark_party_changed()
+    return True
+
+
+def _load_party_snapshot(version):
+    """
+    파티+참여자 1회, 맛집 라벨 1회 - 총 2번의 쿼리로 스냅샷을 만듭니다.
+    조회가 실패하면(컬럼도 없는 빈 DataFrame) None - 빈 결과를 스냅샷으로 캐시하지 않도록
+    """
+    rows = fetch_query(PARTY_SNAPSHOT_QUERY)
+    restaurants = fetch_query("SELECT id, name, category FROM restaurants ORDER BY name")
+    if any(df.empty and len(df.columns) == 0 for df in (rows, restaurants)):
+        return None
+
+    rest_labels = {}
+    if not restaurants.empty:
+        labels = restaurants["name"].astype(str) + " (" + restaurants["category"].astype(str) + ")"
+        rest_labels = dict(zip(labels, restaurants["id"]))
+
+    if rows.empty:
+        return PartySnapshot({}, {}, rest_labels, version)
+
+    joined = rows.dropna(subset=["participant_id"])
+    participants = {
+        party_id: [{"id": uid, "name": name}
+                   for uid, name in zip(group["participant_id"], group["participant_name"])]
+        for party_id, group in joined.groupby("id", sort=False)
+    }
+
+    party_rows = rows.drop_duplicates(subset=["id"])[PARTY_COLUMNS]
+    parties = {}
+    for record in party_rows.to_dict("records"):
+        record["is_anonymous"] = bool(record["is_anonymous"])
+        record["current_people"] = len(participants.get(record["id"], []))
+        parties[record["id"]] = record
+    return PartySnapshot(parties, participants, rest_labels, version)
+
+
+def get_party_snapshot(max_age=PARTY_SNAPSHOT_MAX_AGE):
+    """
+    오늘 모집 중인 파티 + 전체 참여자 + 맛집 선택 목록.
+    parties_version이 같으면 DB를 다시 조회하지 않으므로 파티를 바꿔 보거나 폴링해도 왕복이 없습니다.
+
+    Returns:
+        PartySnapshot
+    """
+    version = get_parties_version()
+    cache = _get_party_cache()
+    with cache.lock:
+        snapshot = cache.snapshot
+        if (
+            snapshot is None
+            or snapshot.version != version  # 카운터를 못 읽으면(None) max_age 기준으로만 갱신
+            or cache.loaded_day != datetime.now().date()
+            or time.monotonic() - cache.loaded_at > max_age
+        ):
+            loaded = _load_party_snapshot(version)
+            if loaded is None:
+                # 조회 실패 - 캐시는 그대로 두고 다음 호출에서 다시 시도 (이전 스냅샷이 있으면 그것을 보여줌)
+                return snapshot or PartySnapshot({}, {}, {}, None)
+            snapshot = loaded
+            cache.snapshot = snapshot
+            cache.loaded_at = time.monotonic()
+            cache.loaded_day = datetime.now().date()
+        return snapshot
+
+
 def create_party(restaurant_id, host_id, max_people, is_anonymous):
     """새로운 파티를 생성하고 방장을 참여자로 등록합니다."""
     party_id = str(uuid.uuid4())[:8]
-    
-    # 1. 파티 생성 (Placeholder를 %s로 변경, 파라미터는 튜플로 전달)
-    query_party = """
-        INSERT INTO parties (id, restaurant_id, host_id, max_people, is_anonymous, created_at, status)
-        VALUES (%s, %s, %s, %s, %s, %s, 'OPEN')
-    """
-    params_party = (party_id, restaurant_id, host_id, max_people, is_anonymous, datetime.now())
-    
-    execute_query(query_party, params_party)
-    
-    # 2. 방장을 참여자로 자동 등록 (내부 함수 호출 시 DB 에러 방지를 위해 직접 쿼리 실행)
+    now = datetime.now()
+
+    # 파티 생성 + 방장 자동 참여 + 버전 증가를 한 트랜잭션으로 (쓰기는 한 번의 왕복으로 전송)
     try:
-        query_host = "INSERT INTO party_participants (party_id, user_id, joined_at) VALUES (%s, %s, %s)"
-        execute_query(query_host, (party_id, host_id, datetime.now()))
+        with unit_of_work() as uow:
+            uow.add(
+                """
+                INSERT INTO parties (id, restaurant_id, host_id, max_people, is_anonymous, created_at, status)
+                VALUES (%s, %s, %s, %s, %s, %s, 'OPEN')
+                """,
+                (party_id, restaurant_id, host_id, max_people, is_anonymous, now),
+            )
+            uow.add(
+                "INSERT INTO party_participants (party_id, user_id, joined_at) VALUES (%s, %s, %s)",
+                (party_id, host_id, now),
+            )
+            uow.add(BUMP_PARTIES_VERSION)
+    except (PoolConnectionError, PoolTimeoutError) as e:
+        st.error(f"데이터베이스 연결 실패: {e}")
+        return None
     except Exception as e:
-        print(f"Host Join Error: {e}")
-        
+        st.error(f"쿼리 실행 실패: {e}")
+        return None
+
+    _mark_party_changed()
     return party_id
 
+
+class JoinStatus(Enum):
+    JOINED = "joined"
+    FULL = "full"
+    ALREADY_JOINED = "already_joined"
+    NOT_FOUND = "not_found"
+    CLOSED = "closed"
+    ERROR = "error"
+
+
+JOIN_MESSAGES = {
+    JoinStatus.JOINED: "파티 참여 성공! 🎉",
+    JoinStatus.FULL: "앗! 그 사이에 자리가 꽉 찼습니다. 😭",
+    JoinStatus.ALREADY_JOINED: "이미 참여 중인 파티입니다.",
+    JoinStatus.NOT_FOUND: "존재하지 않는 파티입니다.",
+    JoinStatus.CLOSED: "모집이 끝난 파티입니다.",
+}
+
+
+class JoinResult(NamedTuple):
+    status: JoinStatus
+    message: str
+
+    @property
+    def ok(self):
+        return self.status is JoinStatus.JOINED
+
+
 def join_party(party_id, user_id):
     """
-    파티 참여 로직 (인원수 체크 포함)
+    파티 참여 (인원 / 중복 체크와 입장을 하나의 트랜잭션으로 처리)
+
+    parties 행을 FOR UPDATE로 잠가서 같은 파티에 대한 참여 요청을 한 줄로 세웁니다.
+    동시에 여러 명이 눌러도 정원을 넘겨 입장하는 일이 없습니다.
+
     Returns:
-        (bool, str): (성공여부, 메시지)
-    """
-    # 1. 인원 체크 (%s 사용)
-    check_query = """
-        SELECT p.max_people, COUNT(pp.user_id) as current_people
-        FROM parties p
-        LEFT JOIN party_participants pp ON p.id = pp.party_id
-        WHERE p.id = %s
-        GROUP BY p.id
-    """
-    # fetch_query 결과는 DataFrame입니다.
-    df = fetch_query(check_query, (party_id,))
-    
-    # DataFrame이 비어있는지 확인하려면 .empty를 사용해야 합니다.
-    if df.empty:
-        return False, "존재하지 않는 파티입니다."
-    
-    # 값 접근 방식 변경: DataFrame의 첫 번째 행(.iloc[0])에서 컬럼명으로 접근
-    max_p = df.iloc[0]['max_people']
-    curr_p = df.iloc[0]['current_people']
-    
-    if curr_p >= max_p:
-        return False, "앗! 그 사이에 자리가 꽉 찼습니다. 😭"
-    
-    # 2. 중복 참여 체크
-    check_user_query = "SELECT * FROM party_participants WHERE party_id=%s AND user_id=%s"
-    check_user_df = fetch_query(check_user_query, (party_id, user_id))
-    
-    # DataFrame이 비어있지 않다면(데이터가 있다면) 이미 참여한 것
-    if not check_user_df.empty:
-        return False, "이미 참여 중인 파티입니다."
-
-    # 3. 입장 처리
+        JoinResult: (status, message) - result.ok 로 성공 여부 확인
+    """
     try:
-        insert_query = "INSERT INTO party_participants (party_id, user_id, joined_at) VALUES (%s, %s, %s)"
-        execute_query(insert_query, (party_id, user_id, datetime.now()))
-        return True, "파티 참여 성공! 🎉"
+        with unit_of_work() as uow:
+            party = uow.fetch_one(
+                "SELECT max_people, status FROM parties WHERE id = %s FOR UPDATE", (party_id,)
+            )
+            if party is None:
+                return JoinResult(JoinStatus.NOT_FOUND, JOIN_MESSAGES[JoinStatus.NOT_FOUND])
+            if party["status"] != "OPEN":
+                return JoinResult(JoinStatus.CLOSED, JOIN_MESSAGES[JoinStatus.CLOSED])
+
+            # 잠금 읽기로 조회해야 앞서 커밋된 참여자까지 확실히 보임
+            counts = uow.fetch_one(
+                """
+                SELECT COUNT(*) AS current_people, COALESCE(SUM(user_id = %s), 0) AS mine
+                FROM party_participants WHERE party_id = %s
+                LOCK IN SHARE MODE
+                """,
+                (user_id, party_id),
+            )
+            if counts["mine"]:
+                return JoinResult(JoinStatus.ALREADY_JOINED, JOIN_MESSAGES[JoinStatus.ALREADY_JOINED])
+            if counts["current_people"] >= party["max_people"]:
+                return JoinResult(JoinStatus.FULL, JOIN_MESSAGES[JoinStatus.FULL])
+
+            uow.add(
+                "INSERT INTO party_participants (party_id, user_id, joined_at) VALUES (%s, %s, %s)",
+                (party_id, user_id, datetime.now()),
+            )
+            uow.add(BUMP_PARTIES_VERSION)
+        _mark_party_changed()
+        return JoinResult(JoinStatus.JOINED, JOIN_MESSAGES[JoinStatus.JOINED])
     except Exception as e:
-        return False, f"오류가 발생했습니다: {str(e)}"
+        return JoinResult(JoinStatus.ERROR, f"오류가 발생했습니다: {str(e)}")
 
 def leave_party(party_id, user_id):
     """파티 나가기"""
     query = "DELETE FROM party_participants WHERE party_id = %s AND user_id = %s"
-    execute_query(query, (party_id, user_id))
-
-def get_active_parties():
-    """
-    모집 중인 파티 목록을 가져옵니다.
-    (수정됨: DataFrame 처리 방식 변경)
-    """
-    query = """
-        SELECT 
-            p.id, 
-            p.restaurant_id, 
-            r.name as restaurant_name,
-            p.host_id,
-            u.name as host_name,
-            p.max_people,
-            p.is_anonymous,
-            p.created_at,
-            COUNT(pp.user_id) as current_people
-        FROM parties p
-        JOIN restaurants r ON p.restaurant_id = r.id
-        JOIN users u ON p.host_id = u.id
-        LEFT JOIN party_participants pp ON p.id = pp.party_id
-        WHERE p.status = 'OPEN' AND DATE(p.created_at) = CURDATE()
-        GROUP BY p.id
-        ORDER BY p.created_at DESC
-    """
-    df = fetch_query(query)
-    
-    # fetch_query가 이미 DataFrame을 반환하므로 .empty로 확인
-    if df.empty:
-        cols = ["id", "restaurant_id", "restaurant_name", "host_id", "host_name", 
-                "max_people", "is_anonymous", "created_at", "current_people"]
-        return pd.DataFrame(columns=cols)
-    
-    return df
-
-def get_party_participants(party_id):
-    """참여자 목록을 DataFrame으로 반환합니다."""
-    query = """
-        SELECT u.id, u.name
-        FROM party_participants pp
-        JOIN users u ON pp.user_id = u.id
-        WHERE pp.party_id = %s
-        ORDER BY pp.joined_at ASC
-    """
-    # 파라미터를 튜플로 전달
-    df = fetch_query(query, (party_id,))
-    
-    if df.empty:
-        return pd.DataFrame(columns=["id", "name"])
-    
-    return df
+    _execute_party_write(query, (party_id, user_id))
 
 def update_party(party_id, restaurant_id, max_people, is_anonymous):
     """파티 정보 수정"""
@@ -379,9 +1063,9 @@ def update_party(party_id, restaurant_id, max_people, is_anonymous):
         WHERE id = %s
     """
     params = (restaurant_id, max_people, is_anonymous, party_id)
-    execute_query(query, params)
+    _execute_party_write(query, params)
 
 def delete_party(party_id):
     """파티 삭제"""
     query = "DELETE FROM parties WHERE id = %s"
-    execute_query(query, (party_id,))
\ No newline at end of file
+    _execute_party_write(query, (party_id,))
\ No newline at end of file
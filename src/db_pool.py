@@ -0,0 +1,351 @@
+import threading
+import time
+import queue
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import pymysql
+from pymysql.constants import CLIENT
+import streamlit as st
+
+# =============================================================================
+# MySQL 커넥션 풀
+# - 프로세스 전체에서 하나의 풀을 공유합니다 (st.cache_resource).
+# - 매 쿼리마다 TCP 연결 + 인증 핸드셰이크를 하던 비용을 없앱니다.
+# =============================================================================
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_POOL_TIMEOUT = 10          # 커넥션 대기 최대 시간(초)
+DEFAULT_HEALTH_CHECK_INTERVAL = 30  # 이 시간(초) 이상 놀고 있던 커넥션은 ping으로 확인
+DEFAULT_POOL_RECYCLE = 3600        # 이 시간(초)보다 오래된 커넥션은 새로 연결
+
+
+class PoolConnectionError(Exception):
+    """DB 서버에 연결할 수 없을 때 발생"""
+
+
+class PoolTimeoutError(Exception):
+    """풀에서 커넥션을 제한 시간 안에 받지 못했을 때 발생"""
+
+
+def load_db_config():
+    """secrets.toml의 [connections.mysql] 설정을 읽어 풀 설정으로 변환"""
+    mysql_config = st.secrets["connections"]["mysql"]
+    parsed = urlparse(mysql_config["url"])
+
+    return {
+        "connect_kwargs": {
+            "host": parsed.hostname,
+            "port": parsed.port or 3306,
+            "user": parsed.username,
+            "password": parsed.password,
+            "database": parsed.path.lstrip("/"),
+            "charset": "utf8mb4",
+            # 풀에서 재사용되는 커넥션이 이전 SELECT의 스냅샷에 묶이지 않도록 autocommit 사용
+            "autocommit": True,
+        },
+        "pool_size": int(mysql_config.get("pool_size", DEFAULT_POOL_SIZE)),
+        "timeout": float(mysql_config.get("pool_timeout", DEFAULT_POOL_TIMEOUT)),
+        "health_check_interval": float(
+            mysql_config.get("pool_health_check_interval", DEFAULT_HEALTH_CHECK_INTERVAL)
+        ),
+        "recycle": float(mysql_config.get("pool_recycle", DEFAULT_POOL_RECYCLE)),
+    }
+
+
+class ConnectionPool:
+    """
+    pymysql 커넥션 풀.
+    - pool_size 개수만큼만 동시에 커넥션을 빌려줍니다.
+    - 오래 놀던 커넥션은 ping으로 상태를 확인하고, 끊겼으면 다시 연결합니다.
+    - 체크아웃마다 대기 시간 / 사용 시간을 기록합니다.
+    """
+
+    def __init__(self, connect_kwargs, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT,
+                 health_check_interval=DEFAULT_HEALTH_CHECK_INTERVAL, recycle=DEFAULT_POOL_RECYCLE):
+        self.connect_kwargs = connect_kwargs
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.recycle = recycle
+
+        # (conn, created_at, last_used_at) - 최근에 쓴 커넥션부터 재사용(LIFO)
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "checkouts": 0,
+            "created": 0,
+            "reconnects": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "hold_ms_total": 0.0,
+            "hold_ms_max": 0.0,
+            "last_wait_ms": 0.0,
+            "last_hold_ms": 0.0,
+        }
+
+    # -------------------------------------------------------------------------
+    # 내부 함수
+    # -------------------------------------------------------------------------
+    def _connect(self):
+        try:
+            conn = pymysql.connect(**self.connect_kwargs)
+        except pymysql.err.MySQLError as e:
+            raise PoolConnectionError(e) from e
+        self._bump("created")
+        now = time.monotonic()
+        return conn, now, now
+
+    def _bump(self, key, value=1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _is_healthy(self, conn, created_at, last_used_at):
+        """재사용해도 되는 커넥션인지 확인 (필요할 때만 ping)"""
+        now = time.monotonic()
+        if not conn.open or now - created_at > self.recycle:
+            return False
+        if now - last_used_at < self.health_check_interval:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except pymysql.err.MySQLError:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                conn, created_at, last_used_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if self._is_healthy(conn, created_at, last_used_at):
+                return conn, created_at, last_used_at
+
+            # 끊어졌거나 너무 오래된 커넥션은 버리고 다시 연결
+            self._close_quietly(conn)
+            self._bump("reconnects")
+
+    def _checkin(self, conn, created_at, broken):
+        if broken or not conn.open:
+            self._close_quietly(conn)
+            self._bump("discarded")
+            return
+        self._idle.put((conn, created_at, time.monotonic()))
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _record_timing(self, wait_ms, hold_ms):
+        with self._stats_lock:
+            s = self.stats
+            s["checkouts"] += 1
+            s["wait_ms_total"] += wait_ms
+            s["wait_ms_max"] = max(s["wait_ms_max"], wait_ms)
+            s["hold_ms_total"] += hold_ms
+            s["hold_ms_max"] = max(s["hold_ms_max"], hold_ms)
+            s["last_wait_ms"] = wait_ms
+            s["last_hold_ms"] = hold_ms
+
+    # -------------------------------------------------------------------------
+    # 공개 API
+    # -------------------------------------------------------------------------
+    @contextmanager
+    def connection(self):
+        """
+        풀에서 커넥션을 하나 빌려옵니다.
+
+        with pool.connection() as conn:
+            ...
+        """
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._bump("timeouts")
+            raise PoolTimeoutError(f"{self.timeout}초 안에 DB 커넥션을 받지 못했습니다.")
+
+        try:
+            conn, created_at, _ = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+
+        checked_out = time.perf_counter()
+        broken = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            # 네트워크/서버 쪽 오류가 난 커넥션은 풀에 돌려놓지 않음
+            broken = True
+            raise
+        finally:
+            released = time.perf_counter()
+            self._checkin(conn, created_at, broken)
+            self._slots.release()
+            self._record_timing((checked_out - started) * 1000, (released - checked_out) * 1000)
+
+    def stats_snapshot(self):
+        """풀 사용 통계 (평균 대기/사용 시간 포함)"""
+        with self._stats_lock:
+            s = dict(self.stats)
+        n = s["checkouts"] or 1
+        s["wait_ms_avg"] = s["wait_ms_total"] / n
+        s["hold_ms_avg"] = s["hold_ms_total"] / n
+        s["idle"] = self._idle.qsize()
+        s["pool_size"] = self.pool_size
+        return s
+
+    def close_all(self):
+        """놀고 있는 커넥션을 모두 닫습니다."""
+        while True:
+            try:
+                conn, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close_quietly(conn)
+
+
+_pool_size_override = None
+
+
+def set_pool_size(pool_size):
+    """
+    secrets의 pool_size 대신 쓸 풀 크기를 지정합니다 (manage.py 부하 테스트처럼 동시 요청이 많은 스크립트용).
+    이미 만들어진 풀은 버리고, 다음 get_pool / get_batch_pool 호출 때 새 크기로 다시 만듭니다.
+    """
+    global _pool_size_override
+    _pool_size_override = int(pool_size)
+    get_pool.clear()
+    get_batch_pool.clear()
+
+
+def _build_pool(multi_statements=False):
+    config = load_db_config()
+    connect_kwargs = dict(config["connect_kwargs"])
+    if multi_statements:
+        connect_kwargs["client_flag"] = CLIENT.MULTI_STATEMENTS
+    return ConnectionPool(
+        connect_kwargs,
+        pool_size=_pool_size_override or config["pool_size"],
+        timeout=config["timeout"],
+        health_check_interval=config["health_check_interval"],
+        recycle=config["recycle"],
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_pool():
+    """프로세스 전역에서 공유하는 커넥션 풀 (한 번에 한 문장만 실행)"""
+    return _build_pool()
+
+
+@st.cache_resource(show_spinner=False)
+def get_batch_pool():
+    """
+    UnitOfWork 전용 풀. 여러 쓰기 문장을 한 번의 왕복으로 보내도록 MULTI_STATEMENTS를 켭니다.
+    (일반 조회/쓰기 커넥션에는 켜지 않아 SQL 인젝션이 생겨도 문장을 덧붙일 수 없게 함)
+    """
+    return _build_pool(multi_statements=True)
+
+
+class UnitOfWork:
+    """
+    하나의 커넥션 / 하나의 트랜잭션 안에서 여러 쿼리를 실행합니다.
+    - fetch_one: 모아 둔 쓰기 쿼리와 SELECT를 한 번에 전송 (DB 왕복 1회)
+    - add: 쓰기 쿼리를 모아 두었다가 flush / 커밋 때 한 번에 전송
+    BEGIN은 첫 전송 맨 앞에, COMMIT은 마지막 전송 맨 뒤에 붙여서 따로 왕복하지 않습니다.
+    round_trips에는 이 커넥션으로 보낸 DB 왕복(ROLLBACK 포함)을 모두 기록합니다.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.round_trips = 0
+        self.begun = False  # BEGIN을 이미 보냈는지
+        self._pending = []
+
+    def _send(self, statements):
+        """
+        statements를 한 번의 왕복으로 실행하고, 마지막 결과 집합의 첫 행(dict)을 반환합니다.
+        아직 트랜잭션을 시작하지 않았으면 맨 앞에 BEGIN을 붙입니다.
+        """
+        if not self.begun:
+            statements = ["START TRANSACTION"] + statements
+        batch = ";\n".join(statements)
+        row = None
+        with self.conn.cursor(pymysql.cursors.DictCursor) as cursor:
+            self.begun = True  # 보내는 도중 실패해도 ROLLBACK이 필요함
+            self.round_trips += 1
+            cursor.execute(batch)
+            # 뒤쪽 문장에서 난 오류도 여기서 올라오도록 결과를 모두 소비
+            while True:
+                if cursor.description:
+                    row = cursor.fetchone()
+                if not cursor.nextset():
+                    break
+        return row
+
+    def fetch_one(self, query, params=None):
+        """SELECT 결과의 첫 행을 dict로 반환 (없으면 None) - 모아 둔 쓰기 쿼리도 함께 전송"""
+        with self.conn.cursor() as cursor:
+            select = cursor.mogrify(query, params).strip().rstrip(";")
+        statements, self._pending = self._pending + [select], []
+        return self._send(statements)
+
+    def add(self, query, params=None):
+        """쓰기 쿼리를 배치에 추가 (파라미터는 이 시점에 이스케이프)"""
+        with self.conn.cursor() as cursor:
+            self._pending.append(cursor.mogrify(query, params).strip().rstrip(";"))
+
+    def flush(self):
+        """모아 둔 쓰기 쿼리를 한 번의 왕복으로 실행"""
+        if not self._pending:
+            return
+        statements, self._pending = self._pending, []
+        self._send(statements)
+
+    def commit(self):
+        """남은 쓰기 쿼리 + COMMIT을 한 번에 전송 (아무것도 보내지 않았으면 왕복 없음)"""
+        if not self._pending and not self.begun:
+            return
+        statements, self._pending = self._pending + ["COMMIT"], []
+        self._send(statements)
+
+    def rollback(self):
+        self._pending = []
+        if self.begun:
+            self.conn.rollback()
+            self.round_trips += 1
+
+
+@contextmanager
+def unit_of_work():
+    """
+    트랜잭션 단위 작업. 블록이 정상 종료되면 커밋, 예외가 나면 전부 롤백합니다.
+
+    with unit_of_work() as uow:
+        uow.fetch_one(...)
+        uow.add(...)
+    """
+    with get_batch_pool().connection() as conn:
+        uow = UnitOfWork(conn)
+        try:
+            yield uow
+            uow.commit()
+        except Exception:
+            try:
+                uow.rollback()
+            except pymysql.err.MySQLError:
+                pass
+            raise
+
+
+def get_pool_stats():
+    """현재 풀 통계를 반환합니다 (일반 풀 기준)."""
+    return get_pool().stats_snapshot()
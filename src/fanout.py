@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# =============================================================================
+# 독립적인 DB / HTTP 호출을 동시에 실행하는 작은 팬아웃 실행기
+# - 스레드에 현재 스크립트 컨텍스트를 붙여서 st.cache_data / st.connection 을 그대로 쓸 수 있습니다.
+# - 마감 시간(deadline) 안에 끝나지 않은 작업은 결과 없이 timed_out 으로 표시합니다.
+# =============================================================================
+
+MAX_WORKERS = 8
+DEFAULT_DEADLINE = 8.0  # 초
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    """프로세스 전체에서 공유하는 스레드 풀"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fanout")
+        return _executor
+
+
+class FanoutResult:
+    """팬아웃 실행 결과 (작업 이름별 값 / 오류 / 소요 시간)"""
+
+    def __init__(self):
+        self.values = {}
+        self.errors = {}
+        self.timed_out = []
+        self.durations_ms = {}
+        self.wall_ms = 0.0
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    @property
+    def serial_ms(self):
+        """하나씩 순서대로 실행했다면 걸렸을 시간 (각 작업 소요 시간의 합)"""
+        return sum(self.durations_ms.values())
+
+    @property
+    def saved_ms(self):
+        return max(0.0, self.serial_ms - self.wall_ms)
+
+    def summary(self):
+        """페이지에 보여줄 한 줄 요약"""
+        text = f"⚡ 병렬 조회 {self.wall_ms:,.0f}ms (순차 실행 시 {self.serial_ms:,.0f}ms, {self.saved_ms:,.0f}ms 절약)"
+        if self.timed_out:
+            text += f" · 시간 초과: {', '.join(self.timed_out)}"
+        return text
+
+
+def run_parallel(tasks, deadline=DEFAULT_DEADLINE):
+    """
+    여러 작업을 동시에 실행하고 마감 시간까지 기다립니다.
+
+    Args:
+        tasks: {이름: 인자 없는 함수} (인자가 필요하면 lambda / functools.partial 사용)
+        deadline: 전체 마감 시간(초)
+
+    Returns:
+        FanoutResult: 실패한 작업은 errors, 시간 안에 못 끝난 작업은 timed_out 에 기록
+    """
+    result = FanoutResult()
+    ctx = get_script_run_ctx()
+    lock = threading.Lock()
+
+    def timed(name, fn):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        started = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            with lock:
+                result.durations_ms[name] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    executor = _get_executor()
+    futures = {executor.submit(timed, name, fn): name for name, fn in tasks.items()}
+    done, not_done = wait(futures, timeout=deadline)
+    result.wall_ms = (time.perf_counter() - started) * 1000
+
+    for future in done:
+        name = futures[future]
+        try:
+            result.values[name] = future.result()
+        except Exception as e:
+            result.errors[name] = e
+    for future in not_done:
+        name = futures[future]
+        result.timed_out.append(name)
+        # 끝나지 않은 작업은 순차 시간에 마감 시간까지만 반영
+        with lock:
+            result.durations_ms.setdefault(name, result.wall_ms)
+    return result
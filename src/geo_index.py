@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# 지오해시 공간 인덱스
+# - restaurants.geohash 컬럼에 저장할 지오해시를 만들고, 반경을 덮는 셀을 계산합니다.
+# - price_index.PriceIndex가 그 셀 접두사로 후보를 찾고, 정확한 반경 판정은 하버사인 거리로 합니다.
+# =============================================================================
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # DB에 저장하는 정밀도 (약 5m)
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEG = 111320
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    """위경도 -> 지오해시 문자열"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars, bits, bit_count, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                bits = (bits << 1) | 1
+                lon_lo = mid
+            else:
+                bits <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def cell_size_deg(precision):
+    """지오해시 셀 한 칸의 (위도 높이, 경도 너비) - 도 단위"""
+    lat_bits = (5 * precision) // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def precision_for_radius(radius_m, lat):
+    """가운데 셀 + 이웃 8칸으로 반경 원을 덮을 수 있는 가장 세밀한 정밀도"""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_deg, lon_deg = cell_size_deg(precision)
+        height_m = lat_deg * METERS_PER_DEG
+        width_m = lon_deg * METERS_PER_DEG * math.cos(math.radians(lat))
+        if min(height_m, width_m) >= radius_m:
+            return precision
+    return 1
+
+
+def covering_cells(lat, lon, radius_m):
+    """반경 원을 덮는 지오해시 접두사 목록 (가운데 + 이웃 8칸)"""
+    precision = precision_for_radius(radius_m, lat)
+    lat_deg, lon_deg = cell_size_deg(precision)
+
+    cells = []
+    for dlat in (-lat_deg, 0.0, lat_deg):
+        for dlon in (-lon_deg, 0.0, lon_deg):
+            n_lat = max(-90.0, min(90.0, lat + dlat))
+            n_lon = (lon + dlon + 180.0) % 360.0 - 180.0
+            cell = encode(n_lat, n_lon, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """두 지점 사이 거리(m). numpy 배열도 받을 수 있습니다."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def fill_geohash(df, lat_col="lat", lon_col="lon"):
+    """DataFrame의 좌표로 지오해시 Series를 만듭니다 (좌표 없으면 None)."""
+    return pd.Series(
+        [encode(la, lo) if pd.notna(la) and pd.notna(lo) else None
+         for la, lo in zip(df[lat_col], df[lon_col])],
+        index=df.index,
+    )
@@ -0,0 +1,259 @@
+import hashlib
+import re
+import threading
+import time
+
+from geopy.geocoders import Nominatim
+
+from db_pool import get_pool
+import geo_index
+
+# =============================================================================
+# 주소 -> 좌표 변환 (지오코딩)
+# - 정규화한 주소 기준으로 geocode_cache 테이블에 영구 저장합니다.
+# - Nominatim 이용 정책(초당 1회)을 지키도록 토큰 버킷으로 호출 속도를 제한합니다.
+# - 좌표가 없는 맛집은 백그라운드 스레드가 천천히 채웁니다.
+# =============================================================================
+
+NOMINATIM_USER_AGENT = "woorifisa_foodie_map"
+NOMINATIM_TIMEOUT = 5
+NOMINATIM_RATE_PER_SEC = 1.0
+NEGATIVE_CACHE_SECONDS = 60 * 60 * 24 * 7  # 못 찾은 주소는 일주일 뒤에 다시 시도
+
+STATUS_OK = "OK"
+STATUS_NOT_FOUND = "NOT_FOUND"
+STATUS_PENDING = "PENDING"  # 일시적 오류 / 호출 차례 대기 시간 초과 - 나중에 다시 시도
+
+
+class TokenBucket:
+    """초당 rate개 토큰이 채워지는 버킷 (capacity개까지 몰아서 사용 가능)"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """토큰 하나를 가져옵니다. timeout 안에 못 받으면 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+_bucket = TokenBucket(NOMINATIM_RATE_PER_SEC)
+_geolocator = Nominatim(user_agent=NOMINATIM_USER_AGENT, timeout=NOMINATIM_TIMEOUT)
+
+# 프로세스 메모리 캐시: address_key -> (lat, lon) 또는 None(못 찾음)
+_memory = {}
+_memory_lock = threading.Lock()
+
+
+def normalize_address(address):
+    """공백/대소문자 차이를 없앤 주소"""
+    return re.sub(r"\s+", " ", str(address or "")).strip().lower()
+
+
+def address_key(address):
+    return hashlib.sha1(normalize_address(address).encode("utf-8")).hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# geocode_cache 테이블 (실패해도 지오코딩 자체는 동작하도록 조용히 넘어감)
+# -----------------------------------------------------------------------------
+CACHE_SELECT = """
+    SELECT lat, lon, status, TIMESTAMPDIFF(SECOND, updated_at, NOW()) AS age
+    FROM geocode_cache WHERE address_key = %s
+"""
+
+
+def cached_result(row):
+    """geocode_cache 행(dict) -> (찾았는지, 좌표 또는 None). 오래된 '못 찾음' 기록은 없는 것으로 봄"""
+    if row is None:
+        return False, None
+    if row["status"] == STATUS_OK:
+        return True, (float(row["lat"]), float(row["lon"]))
+    if row["age"] is not None and row["age"] < NEGATIVE_CACHE_SECONDS:
+        return True, None
+    return False, None
+
+
+def _load_cached(key):
+    """(찾았는지, 좌표 또는 None)"""
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(CACHE_SELECT, (key,))
+                row = cursor.fetchone()
+    except Exception as e:
+        print(f"지오코딩 캐시 조회 실패: {e}")
+        return False, None
+
+    if row is None:
+        return False, None
+    return cached_result(dict(zip(("lat", "lon", "status", "age"), row)))
+
+
+def _store_cached(key, address, coords):
+    lat, lon = coords if coords else (None, None)
+    status = STATUS_OK if coords else STATUS_NOT_FOUND
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO geocode_cache (address_key, address, lat, lon, status)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        lat = VALUES(lat), lon = VALUES(lon),
+                        status = VALUES(status), updated_at = NOW()
+                    """,
+                    (key, normalize_address(address)[:500], lat, lon, status),
+                )
+    except Exception as e:
+        print(f"지오코딩 캐시 저장 실패: {e}")
+
+
+# -----------------------------------------------------------------------------
+# 공개 함수
+# -----------------------------------------------------------------------------
+def lookup_cached(address):
+    """
+    네트워크 호출 없이 캐시만 확인합니다.
+
+    Returns:
+        (bool, tuple | None): (캐시에 있는지, 좌표 - 못 찾은 주소면 None)
+    """
+    key = address_key(address)
+    with _memory_lock:
+        if key in _memory:
+            return True, _memory[key]
+
+    found, coords = _load_cached(key)
+    if found:
+        with _memory_lock:
+            _memory[key] = coords
+    return found, coords
+
+
+def resolve(address, timeout=None):
+    """
+    주소 -> (상태, 좌표).
+    캐시에 없을 때만 Nominatim을 호출하며, 호출 속도는 초당 1회로 제한됩니다.
+
+    Returns:
+        (str, tuple | None):
+            (STATUS_OK, (lat, lon))
+            (STATUS_NOT_FOUND, None) - 주소를 찾을 수 없음 (캐시에 남김)
+            (STATUS_PENDING, None)   - timeout 안에 차례가 안 왔거나 일시적 오류 (캐시하지 않음)
+    """
+    if not normalize_address(address):
+        return STATUS_NOT_FOUND, None
+
+    found, coords = lookup_cached(address)
+    if found:
+        return (STATUS_OK, coords) if coords else (STATUS_NOT_FOUND, None)
+
+    if not _bucket.acquire(timeout=timeout):
+        return STATUS_PENDING, None
+
+    try:
+        location = _geolocator.geocode(address)
+    except Exception as e:
+        print(f"Nominatim 호출 실패: {e}")
+        return STATUS_PENDING, None  # 일시적인 오류는 캐시하지 않음
+
+    coords = (float(location.latitude), float(location.longitude)) if location else None
+    key = address_key(address)
+    _store_cached(key, address, coords)
+    with _memory_lock:
+        _memory[key] = coords
+    return (STATUS_OK, coords) if coords else (STATUS_NOT_FOUND, None)
+
+
+def geocode(address, timeout=None):
+    """
+    주소 -> (lat, lon). 못 찾았거나 timeout 안에 호출 차례가 오지 않으면 None.
+    """
+    return resolve(address, timeout=timeout)[1]
+
+
+def backfill_missing_coords(limit=None):
+    """
+    좌표가 비어 있는 맛집을 지오코딩해서 채웁니다 (초당 1회 속도 제한).
+
+    Returns:
+        (int, int): (채운 맛집 수, 못 찾은 맛집 수)
+    """
+    query = "SELECT id, address FROM restaurants WHERE lat IS NULL OR lon IS NULL ORDER BY added_at"
+    params = None
+    if limit:
+        query += " LIMIT %s"
+        params = (int(limit),)
+
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+
+    updated, failed = 0, 0
+    for rest_id, address in rows:
+        coords = geocode(address)
+        if not coords:
+            failed += 1
+            continue
+        lat, lon = coords
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE restaurants SET lat = %s, lon = %s, geohash = %s WHERE id = %s",
+                    (lat, lon, geo_index.encode(lat, lon), rest_id),
+                )
+        updated += 1
+    return updated, failed
+
+
+_backfill_lock = threading.Lock()
+_backfill_thread = None
+_backfill_requested = False
+
+
+def _run_background_backfill():
+    global _backfill_requested
+    while True:
+        with _backfill_lock:
+            if not _backfill_requested:
+                return
+            _backfill_requested = False
+        try:
+            updated, _ = backfill_missing_coords()
+            if updated:
+                import data_handler as dh
+                dh.invalidate_joined_cache()  # 좌표가 바뀐 맛집을 다시 읽도록
+        except Exception as e:
+            print(f"좌표 백그라운드 채우기 실패: {e}")
+
+
+def start_background_backfill():
+    """
+    좌표 채우기를 백그라운드 스레드에서 실행합니다.
+    이미 돌고 있으면, 현재 작업이 끝난 뒤 한 번 더 돌도록 예약만 합니다.
+    """
+    global _backfill_thread, _backfill_requested
+    with _backfill_lock:
+        _backfill_requested = True
+        if _backfill_thread is not None and _backfill_thread.is_alive():
+            return
+        _backfill_thread = threading.Thread(target=_run_background_backfill, name="geocode-backfill", daemon=True)
+        _backfill_thread.start()
@@ -0,0 +1,208 @@
+import atexit
+import random
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+
+# =============================================================================
+# Google Sheets 쓰기 대기열 (write-behind)
+# - 새 행을 시트 전체를 다시 쓰지 않고 append_rows로 "추가"만 합니다.
+#   시트 끝에 붙이는 것은 구글 쪽에서 처리하므로 두 사람이 동시에 등록해도 서로 덮어쓰지 않습니다.
+# - 모든 세션의 쓰기를 프로세스 하나의 대기열에 모았다가 FLUSH_INTERVAL마다 시트별로 한 번에 보냅니다.
+# - 429(할당량 초과) / 5xx 응답은 지수 백오프로 다시 시도하고, 끝내 실패한 행은 다음 주기에 다시 보냅니다.
+# - 아직 시트에 반영되지 않은 행은 읽을 때 merge_pending으로 합쳐서 바로 보이게 합니다.
+# =============================================================================
+
+FLUSH_INTERVAL = 3  # 초
+MAX_RETRIES = 5
+BASE_DELAY = 1.0    # 초 - 재시도 대기: BASE_DELAY * 2^n + 지터
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# load_gsheet_data의 빈 시트 기본 컬럼과 같은 순서
+COLUMNS = {
+    "restaurants": ["id", "name", "category", "address", "url", "lat", "lon"],
+    "reviews": ["id", "rest_id", "parent_id", "rating", "comment", "timestamp", "user"],
+}
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()  # 백그라운드 스레드와 atexit의 flush가 겹치지 않도록
+_pending = {}   # worksheet -> [row dict, ...] (아직 보내지 않은 행)
+_inflight = {}  # worksheet -> [row dict, ...] (지금 보내는 중인 행)
+_headers = {}   # worksheet -> 시트 첫 줄(헤더) 컬럼 순서
+_flusher = None
+_spreadsheet = None
+_stats = {"appended": 0, "api_calls": 0, "retries": 0, "dropped": 0, "last_error": None}
+
+
+def _open_spreadsheet():
+    """st-gsheets-connection과 같은 secrets([connections.gsheets])로 gspread 스프레드시트를 엽니다."""
+    global _spreadsheet
+    if _spreadsheet is None:
+        import gspread
+
+        config = dict(st.secrets["connections"]["gsheets"])
+        spreadsheet = config.pop("spreadsheet")
+        config.pop("worksheet", None)
+        client = gspread.service_account_from_dict(config)
+        if spreadsheet.startswith("http"):
+            _spreadsheet = client.open_by_url(spreadsheet)
+        else:
+            _spreadsheet = client.open_by_key(spreadsheet)
+    return _spreadsheet
+
+
+def _count(name, n=1):
+    with _lock:
+        _stats[name] += n
+
+
+def _header(worksheet, ws):
+    """
+    시트의 실제 컬럼 순서 (한 번만 읽음).
+    새 / 빈 시트면 기본 컬럼을 1행에 먼저 써서 첫 데이터 행이 헤더로 읽히지 않게 합니다.
+    """
+    if worksheet not in _headers:
+        header = ws.row_values(1)
+        if not header:
+            header = COLUMNS[worksheet]
+            _count("api_calls")
+            ws.update("A1", [header], value_input_option="RAW")
+        _headers[worksheet] = header
+    return _headers[worksheet]
+
+
+def _to_cell(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return value
+
+
+def _status_of(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _append_with_retry(worksheet, rows):
+    """
+    rows를 시트 끝에 한 번의 API 호출로 추가합니다.
+    Returns: True(성공) / False(다시 시도해야 함) / None(재시도해도 안 되는 오류 - 버림)
+    """
+    for attempt in range(MAX_RETRIES):
+        try:
+            ws = _open_spreadsheet().worksheet(worksheet)
+            header = _header(worksheet, ws)
+            values = [[_to_cell(row.get(col)) for col in header] for row in rows]
+            _count("api_calls")
+            ws.append_rows(values, value_input_option="RAW", insert_data_option="INSERT_ROWS")
+            return True
+        except Exception as e:
+            with _lock:
+                _stats["last_error"] = str(e)
+            status = _status_of(e)
+            if status is not None and status not in RETRY_STATUS:
+                print(f"[gsheet_queue] {worksheet} 추가 실패 (HTTP {status}), 행 {len(rows)}개 버림: {e}")
+                return None
+            if attempt + 1 < MAX_RETRIES:
+                _count("retries")
+                time.sleep(BASE_DELAY * (2 ** attempt) + random.uniform(0, BASE_DELAY))
+    with _lock:
+        last_error = _stats["last_error"]
+    print(f"[gsheet_queue] {worksheet} 추가 재시도 초과, 다음 주기에 다시 보냄: {last_error}")
+    return False
+
+
+def flush():
+    """
+    대기 중인 행을 시트별로 한 번씩 보냅니다.
+
+    Returns:
+        int: 이번에 시트에 추가한 행 수
+    """
+    with _flush_lock:
+        return _flush_batches()
+
+
+def _flush_batches():
+    with _lock:
+        batches = {ws: rows for ws, rows in _pending.items() if rows}
+        for worksheet, rows in batches.items():
+            _inflight[worksheet] = rows
+            _pending[worksheet] = []
+
+    appended = 0
+    for worksheet, rows in batches.items():
+        ok = _append_with_retry(worksheet, rows)
+        with _lock:
+            _inflight.pop(worksheet, None)
+            if ok:
+                appended += len(rows)
+                _stats["appended"] += len(rows)
+            elif ok is None:
+                _stats["dropped"] += len(rows)
+            else:
+                # 실패한 행을 그 사이 들어온 행보다 앞에 다시 넣어 순서를 유지
+                _pending[worksheet] = rows + _pending.get(worksheet, [])
+    return appended
+
+
+def _flush_loop():
+    global _flusher
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+        with _lock:
+            if not any(_pending.values()):
+                _flusher = None
+                return
+
+
+def enqueue(worksheet, row):
+    """
+    시트에 추가할 행을 대기열에 넣습니다 (API 호출 없이 바로 반환).
+    FLUSH_INTERVAL 안에 들어온 다른 세션의 행과 함께 한 번에 전송됩니다.
+    """
+    global _flusher
+    with _lock:
+        _pending.setdefault(worksheet, []).append(dict(row))
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="gsheet-flush", daemon=True)
+            _flusher.start()
+
+
+def pending_rows(worksheet):
+    """아직 시트에 반영되지 않은 행 (보내는 중인 행 포함)"""
+    with _lock:
+        return list(_inflight.get(worksheet, [])) + list(_pending.get(worksheet, []))
+
+
+def merge_pending(df, worksheet):
+    """
+    시트에서 읽은 DataFrame에 아직 반영되지 않은 행을 붙입니다.
+    이미 시트에 올라간 행(같은 id)은 중복해서 붙이지 않습니다.
+    """
+    rows = pending_rows(worksheet)
+    if not rows:
+        return df
+    if "id" in df.columns:
+        known = set(df["id"].astype(str))
+        rows = [r for r in rows if str(r.get("id")) not in known]
+        if not rows:
+            return df
+    extra = pd.DataFrame(rows, columns=COLUMNS.get(worksheet))
+    if df.empty:
+        return extra
+    return pd.concat([df, extra], ignore_index=True)
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["pending"] = sum(len(rows) for rows in _pending.values())
+        stats["inflight"] = sum(len(rows) for rows in _inflight.values())
+    return stats
+
+
+# 프로세스가 정상 종료될 때 남은 행을 마지막으로 한 번 보냄
+atexit.register(flush)
@@ -1,69 +1,33 @@
 import streamlit as st
 import re
-import pymysql
-from urllib.parse import urlparse  # [수정] URL 파싱 모듈 추가
+from db_pool import get_pool, PoolConnectionError, PoolTimeoutError
 
-def get_db_connection():
-    """데이터베이스 연결 함수 (pymysql 전용)"""
-    try:
-        # secrets.toml에서 정보 가져오기
-        mysql_config = st.secrets["connections"]["mysql"]
-        url = mysql_config["url"]
-        
-        # [수정] urllib를 사용하여 안전하게 파싱
-        parsed = urlparse(url)
-        
-        # 호스트와 포트 분리
-        host = parsed.hostname
-        port = parsed.port or 3306
-        user = parsed.username
-        password = parsed.password
-        database = parsed.path.lstrip("/")  # 앞에 붙은 '/' 제거
-
-        conn = pymysql.connect(
-            host=host,
-            port=port,
-            user=user,
-            password=password,
-            database=database,
-            charset='utf8mb4'
-        )
-        return conn
-    except Exception as e:
-        st.error(f"데이터베이스 연결 실패: {e}")
-        return None
-    
 def execute_query(query, params=None):
-    """쿼리 실행 함수"""
-    conn = get_db_connection()
-    if conn is None:
-        return False
+    """쿼리 실행 함수 - 공유 커넥션 풀 사용"""
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+            conn.commit()
         return True
+    except (PoolConnectionError, PoolTimeoutError) as e:
+        st.error(f"데이터베이스 연결 실패: {e}")
+        return False
     except Exception as e:
         st.error(f"쿼리 실행 실패: {e}")
-        conn.close()
         return False
 def fetch_query(query, params=None):
     """쿼리 결과 반환 함수"""
-    conn = get_db_connection()
-    if conn is None:
-        return None
     try:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return result
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return cursor.fetchall()
+    except (PoolConnectionError, PoolTimeoutError) as e:
+        st.error(f"데이터베이스 연결 실패: {e}")
+        return None
     except Exception as e:
         st.error(f"쿼리 실행 실패: {e}")
-        conn.close()
         return None
 def is_valid_email(email):
     """이메일 형식을 정규 표현식으로 검사"""
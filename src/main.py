@@ -1,13 +1,14 @@
 # 민석 수정
 import streamlit as st
-import folium
-from streamlit_folium import st_folium
 import plotly.express as px
 import pandas as pd
+import time
 
 # 모듈 불러오기
 import data_handler as dh
+import search_index
 from utils import get_star_rating
+from map_layer import VIEWPORT_MAP_MODES, center_of, render_restaurant_map, render_viewport_map
 # SQL용 컴포넌트와 로그인 페이지를 가져옴
 from login import show_login_page
 from party import render_party_sidebar
@@ -19,10 +20,23 @@ st.title("🍴 우리 반 맛집 미슐랭 가이드")
 if not show_login_page():
     st.stop()
 
-# --- 1. 데이터 초기 로드 (단일 조인 함수 사용) ---
-all_data_df = dh.get_all_data_joined()
+# --- 1. 데이터 버전 (전체 데이터는 읽지 않고, 화면에 필요한 만큼만 그때그때 조회) ---
+data_version = dh.get_data_version()
 
 CATEGORIES = ["전체", "한식", "중식", "일식", "양식", "카페/디저트", "기타"]
+SORT_OPTIONS = {"최신 등록순": "latest", "별점 높은순": "rating", "리뷰 많은순": "reviews", "이름순": "name"}
+CARD_PAGE_SIZE = 12
+
+
+@st.cache_data(ttl=600, show_spinner=False, max_entries=256)
+def load_card_reviews(restaurant_id, data_version):
+    """카드를 펼쳤을 때만 그 맛집의 리뷰를 조회 (최신순, 표시용 time_str 포함)"""
+    reviews = dh.get_reviews_by_restaurant(restaurant_id)
+    if reviews.empty:
+        return []
+    reviews['time_str'] = pd.to_datetime(reviews['timestamp']).dt.strftime('%Y-%m-%d %H:%M').fillna("")
+    return reviews.to_dict("records")
+
 
 # --- 2. 사이드바: 맛집 등록 및 리뷰 ---
 with st.sidebar:
@@ -66,58 +80,71 @@ with st.sidebar:
                 st.warning("가게 이름, 주소, 메뉴 이름은 필수 항목입니다.")
 
 # --- 3. 메인 화면: 탭 구성 ---
-tab_map, tab_trend = st.tabs(["📍 지도 및 목록", "📊 별점 트렌드"])
+tab_map, tab_search, tab_trend = st.tabs(["📍 지도 및 목록", "🔎 검색", "📊 별점 트렌드"])
 
 with tab_map:
     st.subheader("📁 카테고리 필터")
     selected_cat = st.radio("분류", CATEGORIES, horizontal=True)
     
-    # Filter data based on category
-    if selected_cat == "전체":
-        disp_df = all_data_df.copy()
+    # Map rendering (기본 뷰포트 모드는 보이는 영역의 타일만 조회)
+    map_mode = VIEWPORT_MAP_MODES[st.radio("지도 모드", list(VIEWPORT_MAP_MODES.keys()), horizontal=True, key="map_mode")]
+    if map_mode == "viewport":
+        # 처음 지도 중심은 세션마다 한 번만 정함 (바뀌면 지도가 다시 그려짐)
+        if "map_home" not in st.session_state:
+            st.session_state["map_home"] = center_of(dh.get_map_center(data_version))
+        render_viewport_map(st.session_state["map_home"], selected_cat, data_version)
     else:
-        disp_df = all_data_df[all_data_df['category'] == selected_cat]
+        # 클러스터 / WebGL 모드는 선택했을 때만 좌표 목록을 가져옴 (데이터 버전/카테고리별 캐시)
+        map_points = dh.get_map_points(selected_cat, data_version)
+        if not map_points.empty:
+            render_restaurant_map(
+                map_points, "restaurant_name",
+                data_version=data_version, category=selected_cat, mode=map_mode
+            )
+        else:
+            st.info("지도에 표시할 맛집이 없습니다.")
 
-    # Group by restaurant to render one card per restaurant
-    # Dropping rows where restaurant_id is NaN (for restaurants with no reviews yet)
-    unique_restaurants = disp_df.dropna(subset=['restaurant_id']).drop_duplicates(subset=['restaurant_id'])
-    
-    if not unique_restaurants.empty:
-        # Map rendering
-        m = folium.Map(location=[unique_restaurants['lat'].mean(), unique_restaurants['lon'].mean()], zoom_start=15)
-        for _, row in unique_restaurants.iterrows():
-            folium.Marker([row['lat'], row['lon']], tooltip=row['restaurant_name']).add_to(m)
-        st_folium(m, width="100%", height=450)
-
-        st.markdown("---")
-        
-        # Restaurant cards rendering
+    st.markdown("---")
+
+    # Restaurant cards rendering (한 페이지씩 SQL에서 가져와 '더 보기'로 이어 붙임)
+    sort_label = st.selectbox("정렬", list(SORT_OPTIONS.keys()), key="card_sort")
+    listing_key = (selected_cat, SORT_OPTIONS[sort_label], data_version)
+    listing = st.session_state.get("card_listing")
+    if listing is None or listing["key"] != listing_key:
+        first_page, next_cursor = dh.list_restaurants(
+            category=selected_cat, sort=SORT_OPTIONS[sort_label], page_size=CARD_PAGE_SIZE
+        )
+        listing = {"key": listing_key, "rows": first_page.to_dict("records"), "cursor": next_cursor}
+        st.session_state["card_listing"] = listing
+
+    if listing["rows"]:
         cols = st.columns(3)
-        for i, (_, rest_row) in enumerate(unique_restaurants.iterrows()):
+        for i, rest_row in enumerate(listing["rows"]):
             with cols[i % 3]:
                 with st.container(border=True):
-                    # Get all reviews for this restaurant
-                    rest_reviews = disp_df[disp_df['restaurant_id'] == rest_row['restaurant_id']].dropna(subset=['timestamp'])
-                    
-                    # Calculate overall restaurant rating
-                    overall_rating = rest_reviews['rating'].mean()
+                    # Overall restaurant rating from restaurant_stats
+                    overall_rating = rest_row['avg_rating']
                     
                     st.markdown(f"### {rest_row['restaurant_name']}")
-                    st.write(f"**{rest_row['category']}** | {get_star_rating(overall_rating)} ({overall_rating:.2f})")
+                    if pd.notna(overall_rating):
+                        st.write(f"**{rest_row['category']}** | {get_star_rating(overall_rating)} ({overall_rating:.2f})")
+                    else:
+                        st.write(f"**{rest_row['category']}** | 아직 별점 없음")
                     st.caption(f"📍 {rest_row['address']}")
                     
-                    with st.expander("💬 메뉴별 리뷰 보기"):
-                        if not rest_reviews.empty:
-                            # Sort reviews by timestamp
-                            sorted_reviews = rest_reviews.sort_values(by='timestamp', ascending=False)
-                            for _, review_row in sorted_reviews.iterrows():
+                    # expander는 접혀 있어도 내용을 실행하므로, 토글이 켜졌을 때만 리뷰를 조회
+                    if st.toggle("💬 메뉴별 리뷰 보기", key=f"show_reviews_{rest_row['restaurant_id']}"):
+                        rest_reviews = load_card_reviews(rest_row['restaurant_id'], data_version)
+                        if rest_reviews:
+                            # Reviews are sorted by timestamp (newest first)
+                            for review_row in rest_reviews:
                                 st.markdown(f"""
                                 <div style="border-left: 3px solid #ddd; padding-left: 15px; margin-bottom: 10px; background-color: #f9f9f9; padding: 12px; border-radius: 8px;">
                                     <p>
                                         <strong>{review_row['item_name']}</strong> - 
                                         <span style="color: #555;">{review_row['price']:,}원</span>
                                     </p>
-                                    <small><b>@{review_row['user_name']}</b> · {pd.to_datetime(review_row['timestamp']).strftime('%Y-%m-%d %H:%M')}</small><br>
+                                    <small><b>@{review_row['user_name']}</b> · {review_row['time_str']}</small><br>
                                     <span style="color: #f39c12;">{get_star_rating(review_row['rating'])}</span> ({review_row['rating']})<br>
                                     <div style="margin-top:5px;">{review_row['comment']}</div>
                                 </div>
@@ -127,29 +154,53 @@ with tab_map:
                     
                     if pd.notna(rest_row['url']):
                         st.link_button("지도 링크", rest_row['url'], use_container_width=True)
+
+        if listing["cursor"] is not None:
+            if st.button("⬇️ 더 보기", use_container_width=True, key="card_load_more"):
+                next_page, next_cursor = dh.list_restaurants(
+                    category=selected_cat, sort=SORT_OPTIONS[sort_label],
+                    page_size=CARD_PAGE_SIZE, cursor=listing["cursor"]
+                )
+                listing["rows"].extend(next_page.to_dict("records"))
+                listing["cursor"] = next_cursor
+                st.rerun()
     else:
         st.info("선택된 카테고리에 해당하는 맛집이 없습니다.")
 
+with tab_search:
+    st.subheader("🔎 맛집 · 메뉴 · 리뷰 검색")
+    query = st.text_input("검색어", placeholder="예: 국물, 돈까스, 분위기 좋은", key="search_query")
+    if query.strip():
+        started = time.perf_counter()
+        hits = dh.search(query)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        st.caption(f"검색 결과 {len(hits)}건 · {elapsed_ms:.1f}ms")
+        if hits:
+            st.dataframe(search_index.hits_to_frame(hits), use_container_width=True, hide_index=True)
+        else:
+            st.info("검색 결과가 없습니다.")
+
 with tab_trend:
     st.subheader("📈 맛집별 별점 추이")
-    if not all_data_df.dropna(subset=['timestamp']).empty:
-        try:
-            # Prepare data for trend analysis
-            trend_df = all_data_df.dropna(subset=['timestamp', 'rating']).copy()
-            trend_df['date'] = pd.to_datetime(trend_df['timestamp']).dt.date
-            trend_df['rating'] = pd.to_numeric(trend_df['rating'])
-            
-            daily_avg = trend_df.groupby(['date', 'restaurant_name'])['rating'].mean().reset_index()
-            
-            selected_res = st.multiselect("추이를 비교할 맛집 선택", daily_avg['restaurant_name'].unique())
-            if selected_res:
-                filtered = daily_avg[daily_avg['restaurant_name'].isin(selected_res)]
-                fig = px.line(filtered, x='date', y='rating', color='restaurant_name', markers=True, labels={"restaurant_name": "맛집"})
-                fig.update_yaxes(range=[0, 5.5])
-                st.plotly_chart(fig, use_container_width=True)
-            else:
-                st.info("비교할 맛집을 선택해 주세요.")
-        except Exception as e:
-            st.error(f"분석 중 오류 발생: {e}")
+    restaurant_names = dh.get_restaurant_names()
+    if not restaurant_names.empty:
+        name_by_id = dict(zip(restaurant_names['id'].astype(int).tolist(), restaurant_names['name']))
+        selected_ids = st.multiselect(
+            "추이를 비교할 맛집 선택", list(name_by_id.keys()), format_func=lambda rid: name_by_id[rid]
+        )
+        if selected_ids:
+            try:
+                # 선택한 맛집의 날짜별 평균만 DB에서 집계해 가져옴
+                daily_avg = dh.get_daily_ratings(selected_ids)
+                if not daily_avg.empty:
+                    fig = px.line(daily_avg, x='date', y='rating', color='restaurant_name', markers=True, labels={"restaurant_name": "맛집"})
+                    fig.update_yaxes(range=[0, 5.5])
+                    st.plotly_chart(fig, use_container_width=True)
+                else:
+                    st.info("선택한 맛집에 분석할 리뷰 데이터가 없습니다.")
+            except Exception as e:
+                st.error(f"분석 중 오류 발생: {e}")
+        else:
+            st.info("비교할 맛집을 선택해 주세요.")
     else:
         st.info("분석할 리뷰 데이터가 없습니다.")
@@ -1,6 +1,4 @@
 import streamlit as st
-import folium
-from streamlit_folium import st_folium
 import plotly.express as px
 import pandas as pd
 import uuid
@@ -10,6 +8,7 @@ import data_handler as dh
 from utils import get_coords, get_star_rating
 from components import add_review, render_comments
 from login import show_login_page
+from map_layer import MAP_MODES, points_version, render_restaurant_map
 
 st.set_page_config(page_title="우리 반 맛집 실록", layout="wide")
 st.title("🍴 우리 반 맛집 미슐랭 가이드")
@@ -47,7 +46,7 @@ with st.sidebar:
         
         if submitted:
             if u_name and u_address:
-                # 중복 체크를 위해 최신 데이터 다시 로드
+                # 중복 체크를 위해 최신 데이터 다시 로드 (아직 전송 대기 중인 행 포함)
                 current_rest_df = dh.load_gsheet_data("restaurants")
                 existing = current_rest_df[(current_rest_df['name'] == u_name) | (current_rest_df['address'] == u_address)]
                 
@@ -64,8 +63,7 @@ with st.sidebar:
                             "id": rest_id, "name": u_name, "category": u_category, 
                             "address": u_address, "url": u_url, "lat": lat, "lon": lon
                         }
-                        updated_rest_df = pd.concat([current_rest_df, pd.DataFrame([new_rest])], ignore_index=True)
-                        dh.save_gsheet_data(updated_rest_df, "restaurants")
+                        dh.append_gsheet_row(new_rest, "restaurants")
                     else:
                         st.error("❌ 주소를 찾을 수 없습니다. 주소를 다시 확인해 주세요.")
                         rest_id = None
@@ -84,11 +82,12 @@ with tab_map:
     disp_rest = rest_df if selected_cat == "전체" else rest_df[rest_df['category'] == selected_cat]
     
     if not disp_rest.empty:
-        # 지도 생성
-        m = folium.Map(location=[disp_rest['lat'].mean(), disp_rest['lon'].mean()], zoom_start=15)
-        for _, row in disp_rest.iterrows():
-            folium.Marker([row['lat'], row['lon']], tooltip=row['name']).add_to(m)
-        st_folium(m, width="100%", height=450)
+        # 지도 생성 (시트 내용/카테고리별로 캐시된 클러스터 지도)
+        map_mode = st.radio("지도 모드", list(MAP_MODES.keys()), horizontal=True, key="map_mode")
+        render_restaurant_map(
+            disp_rest, "name",
+            data_version=points_version(rest_df), category=selected_cat, mode=MAP_MODES[map_mode]
+        )
 
         st.markdown("---")
         
@@ -79,11 +79,13 @@ with tab_map:
     unique_restaurants = disp_df.dropna(subset=['restaurant_id']).drop_duplicates(subset=['restaurant_id'])
     
     if not unique_restaurants.empty:
-        # Map rendering
-        m = folium.Map(location=[unique_restaurants['lat'].mean(), unique_restaurants['lon'].mean()], zoom_start=15)
-        for _, row in unique_restaurants.iterrows():
-            folium.Marker([row['lat'], row['lon']], tooltip=row['restaurant_name']).add_to(m)
-        st_folium(m, width="100%", height=450)
+        # Map rendering (좌표를 아직 못 채운 맛집은 지도에서만 제외)
+        map_points = unique_restaurants.dropna(subset=['lat', 'lon'])
+        if not map_points.empty:
+            m = folium.Map(location=[map_points['lat'].mean(), map_points['lon'].mean()], zoom_start=15)
+            for _, row in map_points.iterrows():
+                folium.Marker([row['lat'], row['lon']], tooltip=row['restaurant_name']).add_to(m)
+            st_folium(m, width="100%", height=450)
 
         st.markdown("---")
         
@@ -0,0 +1,165 @@
+"""
+관리용 명령어 모음 (src 폴더에서 실행, .streamlit/secrets.toml 필요)
+
+    python manage.py migrate         # 스키마 마이그레이션 적용 (빈 DB면 전체 스키마 생성)
+    python manage.py rebuild-stats   # restaurant_stats 요약 테이블 재계산
+    python manage.py backfill-geohash  # 기존 맛집의 geohash 채우기
+    python manage.py backfill-geocode  # 좌표가 없는 맛집 지오코딩 (초당 1회)
+    python manage.py analyze-reviews   # 리뷰가 바뀐 식당 AI 분석 (cron용)
+    python manage.py party-stress      # 동시 파티 참여 부하 테스트 (로컬/테스트 DB 전용)
+"""
+import argparse
+
+import migrations
+
+
+def cmd_migrate(args):
+    applied = migrations.migrate(dry_run=args.dry_run)
+    if not applied:
+        print("✅ 스키마가 최신입니다.")
+    elif args.dry_run:
+        print(f"🔎 적용할 마이그레이션: {', '.join(applied)}")
+    else:
+        print(f"✅ 마이그레이션 적용 완료: {', '.join(applied)}")
+
+
+def cmd_rebuild_stats(args):
+    import data_handler as dh
+
+    migrations.migrate()
+    count = dh.rebuild_restaurant_stats()
+    print(f"✅ restaurant_stats 재계산 완료: 맛집 {count}곳")
+
+
+def cmd_backfill_geohash(args):
+    import data_handler as dh
+
+    migrations.migrate()
+    count = dh.backfill_geohash()
+    print(f"✅ geohash 채우기 완료: 맛집 {count}곳")
+
+
+def cmd_backfill_geocode(args):
+    import geocoding
+
+    migrations.migrate()
+    updated, failed = geocoding.backfill_missing_coords(limit=args.limit)
+    print(f"✅ 좌표 채우기 완료: 성공 {updated}곳, 실패 {failed}곳")
+
+
+def cmd_analyze_reviews(args):
+    import review_analysis
+
+    migrations.migrate()
+    report = review_analysis.run_batch(
+        workers=args.workers, dry_run=args.dry_run, max_retries=args.retries, limit=args.limit
+    )
+    if report["dry_run"]:
+        print(f"🔎 분석 대상: 식당 {report['targets']}곳 (dry-run, API 호출 없음)")
+        return
+    print(
+        f"✅ 리뷰 분석 완료: 대상 {report['targets']}곳, 성공 {report['succeeded']}곳, "
+        f"실패 {report['failed']}곳, 재시도 {report['retries']}회\n"
+        f"   {report['elapsed_s']:.1f}초, {report['per_min']:.1f}곳/분, 토큰 {report['tokens']:,}개"
+    )
+    if report["failed"]:
+        raise SystemExit(1)
+
+
+def cmd_party_stress(args):
+    """
+    임시 사용자 / 파티를 만들어 동시에 참여 요청을 보내고, 정원을 넘지 않는지 확인합니다.
+    (실제 운영 DB에서 실행하지 마세요. 끝나면 만든 데이터는 지웁니다.)
+    """
+    import uuid
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+
+    import data_handler as dh
+    from db_pool import set_pool_size, unit_of_work
+
+    # 스레드마다 커넥션을 하나씩 잡을 수 있어야 풀 대기가 아니라 DB 잠금 경쟁을 시험하게 됨
+    set_pool_size(args.pool_size or args.threads)
+
+    tag = f"stress_{uuid.uuid4().hex[:6]}"
+    user_ids = [str(uuid.uuid4())[:8] for _ in range(args.users + 1)]
+    host_id, joiner_ids = user_ids[0], user_ids[1:]
+
+    with unit_of_work() as uow:
+        rest = uow.fetch_one("SELECT id FROM restaurants LIMIT 1")
+        if rest is None:
+            raise SystemExit("❌ 맛집이 하나 이상 있어야 합니다.")
+        for i, uid in enumerate(user_ids):
+            uow.add(
+                "INSERT INTO users (id, name, email, joined_at) VALUES (%s, %s, %s, NOW())",
+                (uid, f"{tag}_{i}", f"{tag}_{i}@example.com"),
+            )
+
+    party_id = dh.create_party(rest["id"], host_id, args.capacity, False)
+    if party_id is None:
+        raise SystemExit("❌ 파티 생성에 실패했습니다. (migrate를 먼저 실행했는지 확인하세요)")
+    # 같은 사람이 여러 번 누르는 경우도 섞어서 요청
+    attempts = [uid for uid in joiner_ids for _ in range(args.repeat)]
+    print(f"🚀 파티 {party_id} (정원 {args.capacity}명, 방장 포함)에 참여 요청 {len(attempts)}건 동시 전송")
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(lambda uid: dh.join_party(party_id, uid), attempts))
+
+        with unit_of_work() as uow:
+            row = uow.fetch_one(
+                "SELECT COUNT(*) AS n, COUNT(DISTINCT user_id) AS users FROM party_participants WHERE party_id = %s",
+                (party_id,),
+            )
+    finally:
+        if not args.keep:
+            with unit_of_work() as uow:
+                uow.add("DELETE FROM party_participants WHERE party_id = %s", (party_id,))
+                uow.add("DELETE FROM parties WHERE id = %s", (party_id,))
+                for uid in user_ids:
+                    uow.add("DELETE FROM users WHERE id = %s", (uid,))
+
+    counts = Counter(r.status.value for r in results)
+    print("   결과: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+    print(f"   최종 인원 {row['n']}명 (중복 제외 {row['users']}명) / 정원 {args.capacity}명")
+    if row["n"] > args.capacity or row["n"] != row["users"]:
+        raise SystemExit("❌ 정원 초과 또는 중복 참여가 발생했습니다.")
+    print("✅ 정원 초과 / 중복 참여 없음")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="우리 반 맛집 실록 관리 명령어")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_migrate = sub.add_parser("migrate", help="스키마 마이그레이션 적용")
+    p_migrate.add_argument("--dry-run", action="store_true", help="적용할 마이그레이션만 출력")
+    p_migrate.set_defaults(func=cmd_migrate)
+    sub.add_parser("rebuild-stats", help="restaurant_stats 요약 테이블 재계산").set_defaults(func=cmd_rebuild_stats)
+    sub.add_parser("backfill-geohash", help="기존 맛집의 geohash 채우기").set_defaults(func=cmd_backfill_geohash)
+
+    p_geocode = sub.add_parser("backfill-geocode", help="좌표가 없는 맛집 지오코딩 (초당 1회)")
+    p_geocode.add_argument("--limit", type=int, default=None, help="최대 처리 맛집 수")
+    p_geocode.set_defaults(func=cmd_backfill_geocode)
+
+    p_analyze = sub.add_parser("analyze-reviews", help="리뷰가 바뀐 식당 AI 분석 (cron용)")
+    p_analyze.add_argument("--dry-run", action="store_true", help="대상 식당만 출력하고 API는 호출하지 않음")
+    p_analyze.add_argument("--workers", type=int, default=4, help="동시에 분석할 식당 수")
+    p_analyze.add_argument("--retries", type=int, default=3, help="식당별 최대 시도 횟수")
+    p_analyze.add_argument("--limit", type=int, default=None, help="최대 처리 식당 수")
+    p_analyze.set_defaults(func=cmd_analyze_reviews)
+
+    p_stress = sub.add_parser("party-stress", help="동시 파티 참여 부하 테스트 (로컬/테스트 DB 전용)")
+    p_stress.add_argument("--users", type=int, default=100, help="참여를 시도할 임시 사용자 수")
+    p_stress.add_argument("--repeat", type=int, default=2, help="사용자별 참여 요청 횟수 (중복 클릭)")
+    p_stress.add_argument("--capacity", type=int, default=4, help="파티 정원")
+    p_stress.add_argument("--threads", type=int, default=64, help="동시에 요청을 보내는 스레드 수")
+    p_stress.add_argument("--pool-size", type=int, default=None, help="커넥션 풀 크기 (기본: --threads와 같게)")
+    p_stress.add_argument("--keep", action="store_true", help="끝난 뒤 임시 데이터를 지우지 않음")
+    p_stress.set_defaults(func=cmd_party_stress)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
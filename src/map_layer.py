@@ -0,0 +1,263 @@
+import math
+import threading
+
+import folium
+from folium.plugins import FastMarkerCluster
+import pandas as pd
+import pydeck as pdk
+import streamlit as st
+import streamlit.components.v1 as components
+
+# =============================================================================
+# 맛집 지도 레이어
+# - 마커는 브라우저에서 클러스터링 (FastMarkerCluster) 하거나 pydeck(WebGL)으로 그립니다.
+# - 결과는 (데이터 버전, 카테고리, 모드) 별로 캐시되어 바뀌지 않은 지도는 다시 만들지 않습니다.
+# =============================================================================
+
+MAP_MODES = {"클러스터": "cluster", "WebGL (pydeck)": "deck"}
+VIEWPORT_MAP_MODES = {"뷰포트 (이동/확대 시 로딩)": "viewport", **MAP_MODES}
+MAP_HEIGHT = 450
+DEFAULT_CENTER = (37.5786, 126.8972)  # 상암동
+
+# 마커는 JS에서 만들고, 이름은 textContent로 넣어 HTML로 해석되지 않게 함
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    var label = document.createElement("span");
+    label.textContent = row[2];
+    marker.bindTooltip(label);
+    return marker;
+};
+"""
+
+
+def map_points(df, name_col):
+    """지도에 찍을 [lat, lon, 이름] 목록 (좌표 없는 맛집 제외)"""
+    points = df[["lat", "lon", name_col]].dropna(subset=["lat", "lon"])
+    points = points.drop_duplicates(subset=["lat", "lon", name_col])
+    return [[float(lat), float(lon), str(name)] for lat, lon, name in points.itertuples(index=False, name=None)]
+
+
+def points_version(df, cols=("id", "lat", "lon")):
+    """데이터 버전이 따로 없는 경우(구글 시트) 지도용 컬럼 내용으로 버전을 만듭니다."""
+    if df.empty:
+        return 0
+    return int(pd.util.hash_pandas_object(df[list(cols)], index=False).sum())
+
+
+def _center(points):
+    if not points:
+        return DEFAULT_CENTER
+    lats = [p[0] for p in points]
+    lons = [p[1] for p in points]
+    return sum(lats) / len(lats), sum(lons) / len(lons)
+
+
+def center_of(df):
+    """df의 좌표 평균. 좌표가 하나도 없으면(모두 지오코딩 대기 중) DEFAULT_CENTER"""
+    lats = pd.to_numeric(df["lat"], errors="coerce")
+    lons = pd.to_numeric(df["lon"], errors="coerce")
+    valid = lats.notna() & lons.notna()
+    if not valid.any():
+        return DEFAULT_CENTER
+    return float(lats[valid].mean()), float(lons[valid].mean())
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def build_cluster_map_html(data_version, category, name_col, _df):
+    """클러스터링된 folium 지도를 HTML 문자열로 만들어 캐시합니다."""
+    points = map_points(_df, name_col)
+    m = folium.Map(location=_center(points), zoom_start=15)
+    if points:
+        FastMarkerCluster(points, callback=MARKER_CALLBACK).add_to(m)
+    return m.get_root().render()
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def build_deck(data_version, category, name_col, _df):
+    """pydeck(WebGL) 산점도 지도를 만들어 캐시합니다."""
+    points = map_points(_df, name_col)
+    data = pd.DataFrame(points, columns=["lat", "lon", "name"])
+    lat, lon = _center(points)
+    layer = pdk.Layer(
+        "ScatterplotLayer",
+        data=data,
+        get_position="[lon, lat]",
+        get_radius=25,
+        radius_min_pixels=4,
+        get_fill_color=[230, 57, 70, 200],
+        pickable=True,
+    )
+    view = pdk.ViewState(latitude=lat, longitude=lon, zoom=14)
+    return pdk.Deck(layers=[layer], initial_view_state=view, tooltip={"text": "{name}"})
+
+
+def render_restaurant_map(df, name_col, data_version, category, mode="cluster"):
+    """
+    맛집 지도를 그립니다.
+
+    Args:
+        df: lat, lon, name_col 컬럼이 있는 DataFrame
+        data_version: 데이터가 바뀔 때마다 달라지는 값 (캐시 키)
+        category: 현재 카테고리 필터 (캐시 키)
+        mode: "cluster" 또는 "deck"
+    """
+    if mode == "deck":
+        st.pydeck_chart(build_deck(data_version, category, name_col, df), height=MAP_HEIGHT)
+    else:
+        components.html(build_cluster_map_html(data_version, category, name_col, df), height=MAP_HEIGHT)
+
+
+# =============================================================================
+# 뷰포트 기반 마커 로딩
+# - st_folium이 돌려주는 지도 영역(bounds)에 걸친 타일만 DB에서 가져옵니다.
+# - 한 번 불러온 타일은 데이터 버전이 바뀔 때까지 프로세스 전체에서 재사용합니다.
+# =============================================================================
+
+VIEWPORT_MAP_KEY = "restaurant_viewport_map"
+BASE_TILE_DEG = 0.01      # 레벨 0 타일 한 변 (약 1km)
+MAX_VIEW_TILES = 36       # 한 화면에 걸치는 타일 수 상한 (넘으면 더 큰 타일 레벨 사용)
+MAX_TILE_LEVEL = 12
+MAX_VIEWPORT_MARKERS = 500
+
+
+class ViewportTileCache:
+    """(레벨, x, y) 타일 -> 그 안의 맛집 레코드 목록"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data_version = None
+        self.tiles = {}
+
+
+@st.cache_resource(show_spinner=False)
+def _get_tile_cache():
+    return ViewportTileCache()
+
+
+def parse_bounds(map_state):
+    """st_folium 반환값에서 (south, west, north, east)를 꺼냅니다. 없으면 None"""
+    try:
+        sw = map_state["bounds"]["_southWest"]
+        ne = map_state["bounds"]["_northEast"]
+        return float(sw["lat"]), float(sw["lng"]), float(ne["lat"]), float(ne["lng"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def default_bounds(center, span=0.01):
+    lat, lon = center
+    return lat - span, lon - span, lat + span, lon + span
+
+
+def _tile_size(level):
+    return BASE_TILE_DEG * (2 ** level)
+
+
+def _tile_range(bounds, level):
+    south, west, north, east = bounds
+    size = _tile_size(level)
+    return (
+        math.floor(west / size), math.floor(east / size),
+        math.floor(south / size), math.floor(north / size),
+    )
+
+
+def _tile_level(bounds):
+    """화면에 걸치는 타일 수가 MAX_VIEW_TILES 이하가 되는 가장 작은 레벨"""
+    for level in range(MAX_TILE_LEVEL + 1):
+        x0, x1, y0, y1 = _tile_range(bounds, level)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= MAX_VIEW_TILES:
+            return level
+    return MAX_TILE_LEVEL
+
+
+def load_viewport_restaurants(bounds, data_version):
+    """
+    화면 영역의 맛집을 DataFrame으로 반환합니다.
+    아직 불러오지 않은 타일만 묶어서 한 번의 bbox 쿼리로 가져옵니다.
+
+    Returns:
+        (DataFrame, tile_keys): tile_keys는 화면에 걸친 타일 목록 (캐시 키로 사용)
+    """
+    import data_handler as dh
+
+    level = _tile_level(bounds)
+    x0, x1, y0, y1 = _tile_range(bounds, level)
+    view_tiles = [(level, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    cache = _get_tile_cache()
+    with cache.lock:
+        if cache.data_version != data_version:
+            cache.tiles = {}
+            cache.data_version = data_version
+
+        missing = [t for t in view_tiles if t not in cache.tiles]
+        if missing:
+            size = _tile_size(level)
+            mx0, mx1 = min(t[1] for t in missing), max(t[1] for t in missing)
+            my0, my1 = min(t[2] for t in missing), max(t[2] for t in missing)
+            df = dh.get_restaurants_in_bbox(my0 * size, mx0 * size, (my1 + 1) * size, (mx1 + 1) * size)
+
+            fetched = {(level, x, y): [] for x in range(mx0, mx1 + 1) for y in range(my0, my1 + 1)}
+            for rec in df.dropna(subset=["lat", "lon"]).to_dict("records"):
+                key = (level, math.floor(rec["lon"] / size), math.floor(rec["lat"] / size))
+                if key in fetched:
+                    fetched[key].append(rec)
+            cache.tiles.update(fetched)
+
+        records = [rec for t in view_tiles for rec in cache.tiles.get(t, [])]
+
+    columns = ["restaurant_id", "restaurant_name", "category", "lat", "lon"]
+    return pd.DataFrame(records, columns=columns), tuple(view_tiles)
+
+
+def build_viewport_base_map(center):
+    """
+    마커 없는 기본 지도.
+    st_folium이 마커 레이어를 이 지도에 붙이므로 세션/재실행끼리 공유하지 않도록 매번 새로 만듭니다 (비용은 작음).
+    """
+    return folium.Map(location=center, zoom_start=15)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def viewport_marker_points(data_version, category, tile_keys, _df):
+    """화면 영역 마커 [(lat, lon, 이름), ...] (데이터 버전/카테고리/타일 조합별 캐시)"""
+    rows = _df[["lat", "lon", "restaurant_name"]].head(MAX_VIEWPORT_MARKERS)
+    return [(float(lat), float(lon), str(name)) for lat, lon, name in rows.itertuples(index=False, name=None)]
+
+
+def build_viewport_markers(points):
+    """마커 레이어 (st_folium이 id를 바꾸고 지도에 붙이므로 매번 새로 만듦)"""
+    fg = folium.FeatureGroup(name="restaurants")
+    for lat, lon, name in points:
+        folium.Marker([lat, lon], tooltip=name).add_to(fg)
+    return fg
+
+
+def render_viewport_map(center, category, data_version):
+    """
+    뷰포트 기반 맛집 지도를 그립니다.
+    지도 이동/확대 시 st_folium이 새 영역을 돌려주면, 그 영역의 타일만 추가로 불러옵니다.
+
+    Returns:
+        int: 현재 화면(걸친 타일 포함)에 있는 맛집 수
+    """
+    from streamlit_folium import st_folium
+
+    bounds = parse_bounds(st.session_state.get(VIEWPORT_MAP_KEY)) or default_bounds(center)
+    df, tile_keys = load_viewport_restaurants(bounds, data_version)
+    if category and category != "전체":
+        df = df[df["category"] == category]
+
+    st_folium(
+        build_viewport_base_map(center),
+        key=VIEWPORT_MAP_KEY,
+        feature_group_to_add=build_viewport_markers(viewport_marker_points(data_version, category, tile_keys, df)),
+        returned_objects=["bounds"],
+        height=MAP_HEIGHT,
+        use_container_width=True,
+    )
+    if len(df) > MAX_VIEWPORT_MARKERS:
+        st.caption(f"이 영역의 맛집 {len(df)}곳 중 {MAX_VIEWPORT_MARKERS}곳만 표시합니다. 지도를 확대해 보세요.")
+    return len(df)
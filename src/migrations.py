@@ -0,0 +1,271 @@
+from db_pool import get_pool
+
+# =============================================================================
+# 스키마 마이그레이션
+# - 번호 순서대로 한 번씩만 적용하고, 적용한 번호는 schema_migrations 테이블에 기록합니다.
+# - 빈 DB에 실행하면 기본 테이블(ERD.png)부터 인덱스까지 전체 스키마가 만들어집니다.
+# - 이미 테이블이 있는 기존 DB에서도 안전하도록 CREATE TABLE IF NOT EXISTS /
+#   컬럼·인덱스 존재 확인 후 추가 방식으로 작성합니다.
+# - 새 변경은 MIGRATIONS 끝에 다음 번호로 추가하고, 이미 적용된 항목은 수정하지 않습니다.
+# =============================================================================
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version    INT          NOT NULL PRIMARY KEY,
+        name       VARCHAR(200) NOT NULL,
+        applied_at TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET = utf8mb4
+"""
+
+# -----------------------------------------------------------------------------
+# 1. 기본 테이블
+# -----------------------------------------------------------------------------
+
+BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id        VARCHAR(36)  NOT NULL PRIMARY KEY,
+        email     VARCHAR(255) NULL UNIQUE,
+        name      VARCHAR(100) NOT NULL,
+        joined_at DATETIME     NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS restaurants (
+        id       VARCHAR(36)   NOT NULL PRIMARY KEY,
+        name     VARCHAR(200)  NOT NULL,
+        category VARCHAR(50)   NULL,
+        address  VARCHAR(500)  NULL,
+        lat      DECIMAL(10,7) NULL,
+        lon      DECIMAL(10,7) NULL,
+        url      VARCHAR(500)  NULL,
+        added_at DATETIME      NULL
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS menu_items (
+        id            VARCHAR(36)  NOT NULL PRIMARY KEY,
+        restaurant_id VARCHAR(36)  NOT NULL,
+        item_name     VARCHAR(200) NOT NULL,
+        price         INT          NULL,
+        added_at      DATETIME     NULL,
+        FOREIGN KEY (restaurant_id) REFERENCES restaurants (id) ON DELETE CASCADE
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS menu_reviews (
+        id           VARCHAR(36) NOT NULL PRIMARY KEY,
+        menu_item_id VARCHAR(36) NOT NULL,
+        user_id      VARCHAR(36) NULL,
+        rating       TINYINT     NULL,
+        comment      TEXT        NULL,
+        timestamp    DATETIME    NULL,
+        FOREIGN KEY (menu_item_id) REFERENCES menu_items (id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE SET NULL
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS parties (
+        id            VARCHAR(36) NOT NULL PRIMARY KEY,
+        restaurant_id VARCHAR(36) NOT NULL,
+        host_id       VARCHAR(36) NOT NULL,
+        max_people    INT         NOT NULL,
+        is_anonymous  BOOLEAN     NOT NULL DEFAULT FALSE,
+        created_at    DATETIME    NOT NULL,
+        status        VARCHAR(16) NOT NULL DEFAULT 'OPEN',
+        FOREIGN KEY (restaurant_id) REFERENCES restaurants (id) ON DELETE CASCADE,
+        FOREIGN KEY (host_id) REFERENCES users (id) ON DELETE CASCADE
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS party_participants (
+        party_id  VARCHAR(36) NOT NULL,
+        user_id   VARCHAR(36) NOT NULL,
+        joined_at DATETIME    NOT NULL,
+        PRIMARY KEY (party_id, user_id),
+        FOREIGN KEY (party_id) REFERENCES parties (id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+]
+
+# -----------------------------------------------------------------------------
+# 2. 앱이 추가로 사용하는 테이블
+# -----------------------------------------------------------------------------
+
+APP_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS restaurant_stats (
+        restaurant_id  VARCHAR(36)   NOT NULL PRIMARY KEY,
+        review_count   INT           NOT NULL DEFAULT 0,
+        rating_sum     DECIMAL(10,2) NOT NULL DEFAULT 0,
+        avg_rating     DECIMAL(4,2)  NULL,
+        menu_count     INT           NOT NULL DEFAULT 0,
+        last_review_at DATETIME      NULL,
+        updated_at     TIMESTAMP     NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS geocode_cache (
+        address_key CHAR(40)     NOT NULL PRIMARY KEY,  -- 정규화한 주소의 sha1
+        address     VARCHAR(500) NOT NULL,
+        lat         DOUBLE       NULL,
+        lon         DOUBLE       NULL,
+        status      VARCHAR(16)  NOT NULL,              -- OK / NOT_FOUND
+        updated_at  TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS review_analysis_cache (
+        restaurant_id VARCHAR(36)  NOT NULL,
+        review_hash   CHAR(40)     NOT NULL,          -- 분석한 리뷰 집합의 sha1
+        scores        VARCHAR(200) NOT NULL,          -- JSON 배열 [맛, 가성비, 서비스, 위생, 분위기]
+        summary       TEXT         NOT NULL,
+        review_count  INT          NOT NULL DEFAULT 0,
+        analyzed_at   TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (restaurant_id, review_hash)
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS review_chunk_cache (
+        chunk_hash   CHAR(40)     NOT NULL PRIMARY KEY,  -- 식당 이름 + 청크 리뷰 내용의 sha1
+        scores       VARCHAR(200) NOT NULL,
+        summary      TEXT         NOT NULL,
+        review_count INT          NOT NULL DEFAULT 0,
+        tokens       INT          NOT NULL DEFAULT 0,
+        created_at   TIMESTAMP    NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS parties_version (
+        id         TINYINT   NOT NULL PRIMARY KEY,  -- 항상 1 (한 행짜리 카운터)
+        version    BIGINT    NOT NULL DEFAULT 0,    -- 파티 쓰기 트랜잭션마다 1씩 증가
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) DEFAULT CHARSET = utf8mb4
+    """,
+]
+
+
+# -----------------------------------------------------------------------------
+# 존재 확인 헬퍼
+# -----------------------------------------------------------------------------
+
+def _has_column(cursor, table, column):
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        """,
+        (table, column),
+    )
+    return cursor.fetchone() is not None
+
+
+def _index_columns(cursor, table):
+    """테이블의 인덱스 이름 -> 컬럼 목록 (순서대로)"""
+    cursor.execute(
+        """
+        SELECT index_name, column_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+        """,
+        (table,),
+    )
+    indexes = {}
+    for index_name, column_name in cursor.fetchall():
+        indexes.setdefault(index_name, []).append(column_name)
+    return indexes
+
+
+def _add_column(cursor, table, column, definition):
+    if not _has_column(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _add_index(cursor, name, table, columns):
+    """같은 이름이 없고, 같은 컬럼으로 시작하는 인덱스(PK 포함)도 없을 때만 생성"""
+    indexes = _index_columns(cursor, table)
+    if name in indexes or any(cols[:len(columns)] == list(columns) for cols in indexes.values()):
+        return
+    cursor.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})")
+
+
+# -----------------------------------------------------------------------------
+# 마이그레이션 목록
+# -----------------------------------------------------------------------------
+
+def _create_base_tables(cursor):
+    for ddl in BASE_TABLES:
+        cursor.execute(ddl)
+
+
+def _create_app_tables(cursor):
+    for ddl in APP_TABLES:
+        cursor.execute(ddl)
+
+
+def _add_restaurant_geo(cursor):
+    _add_column(cursor, "restaurants", "geohash", "CHAR(9) NULL")  # 반경 검색용 지오해시
+    _add_index(cursor, "idx_restaurants_lat_lon", "restaurants", ["lat", "lon"])  # 지도 뷰포트(bbox) 조회용
+    _add_index(cursor, "idx_restaurants_geohash", "restaurants", ["geohash"])    # 지오해시 접두사 검색용
+
+
+# 이름: (테이블, 컬럼 목록)
+QUERY_INDEXES = {
+    "idx_menu_items_restaurant": ("menu_items", ["restaurant_id"]),
+    "idx_menu_reviews_menu_item": ("menu_reviews", ["menu_item_id"]),
+    "idx_menu_reviews_timestamp": ("menu_reviews", ["timestamp"]),                 # 조인 캐시 증분 조회
+    "idx_menu_items_added_at": ("menu_items", ["added_at"]),                       # 조인 캐시 증분 조회
+    "idx_restaurants_added_at": ("restaurants", ["added_at"]),                     # 조인 캐시 증분 조회
+    "idx_party_participants_party_user": ("party_participants", ["party_id", "user_id"]),
+    "idx_parties_status_created": ("parties", ["status", "created_at"]),           # 오늘의 원정대
+}
+
+
+def _add_query_indexes(cursor):
+    for name, (table, columns) in QUERY_INDEXES.items():
+        _add_index(cursor, name, table, columns)
+
+
+# (번호, 이름, 적용 함수)
+MIGRATIONS = [
+    (1, "base_tables", _create_base_tables),
+    (2, "app_tables", _create_app_tables),
+    (3, "restaurant_geo", _add_restaurant_geo),
+    (4, "query_indexes", _add_query_indexes),
+]
+
+
+def applied_versions():
+    """이미 적용된 마이그레이션 번호 집합"""
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(SCHEMA_MIGRATIONS_DDL)
+            cursor.execute("SELECT version FROM schema_migrations")
+            return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(dry_run=False):
+    """
+    아직 적용하지 않은 마이그레이션을 번호 순서대로 적용합니다.
+    (MySQL의 DDL은 트랜잭션으로 묶이지 않으므로 각 단계는 다시 실행해도 안전하게 작성)
+
+    Returns:
+        list[str]: 이번에 적용한(dry_run이면 적용할) "번호_이름" 목록
+    """
+    done = applied_versions()
+    pending = [m for m in MIGRATIONS if m[0] not in done]
+    if dry_run:
+        return [f"{version:03d}_{name}" for version, name, _ in pending]
+
+    applied = []
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            for version, name, apply in pending:
+                apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name)
+                )
+                applied.append(f"{version:03d}_{name}")
+    return applied
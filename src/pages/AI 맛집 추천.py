@@ -2,10 +2,6 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import matplotlib.pyplot as plt
-import numpy as np
-from wordcloud import WordCloud
-from geopy.geocoders import Nominatim
 import sys
 import os
 
@@ -20,7 +16,12 @@ MAL_FONT = os.path.join(FONT_DIR, "malgunbd.ttf")           # .../src/fonts/malg
 # recommend.py / data_handler.py import (src 기준)
 sys.path.append(SRC_DIR)
 import recommend
-import data_handler as dh  # (프로젝트 호환 위해 유지)
+import data_handler as dh
+import geocoding
+import review_analysis
+import fanout
+import wordcloud_render
+import ranking
 
 st.set_page_config(page_title="AI 맛집 추천", page_icon="🤖", layout="wide")
 
@@ -63,48 +64,39 @@ def get_korean_font_path():
 # =========================================================
 # 캐시 함수들 (과도한 API/DB 호출 방지)
 # =========================================================
-@st.cache_data(show_spinner=False, ttl=60 * 30)
 def geocode_address(address: str):
-    """주소 -> (lat, lon). 실패하면 None."""
-    try:
-        geolocator = Nominatim(user_agent="foodie_map_app", timeout=5)
-        loc = geolocator.geocode(address)
-        if loc:
-            return float(loc.latitude), float(loc.longitude)
-    except Exception:
-        pass
-    return None
+    """주소 -> (lat, lon). 실패하면 None. (geocode_cache 테이블 공유, 초당 1회 제한)"""
+    return geocoding.geocode(address, timeout=5)
 
 
-@st.cache_data(show_spinner=False, ttl=60 * 10)
 def get_weather_cached(lat: float, lon: float):
-    """날씨 API 호출 캐시"""
-    return recommend.get_weather(lat, lon)
+    """날씨 캐시 (약 1km 격자 x 10분, 오래된 값은 백그라운드에서 갱신)"""
+    return recommend.get_weather_cached(lat, lon)
 
 
-@st.cache_data(show_spinner=False, ttl=60)
-def fetch_menu_df(budget: int):
-    """예산 이하 메뉴 조회"""
-    sql = """
-        SELECT
-            r.name AS r_name,
-            r.category,
-            m.item_name,
-            m.price,
-            r.address
-        FROM menu_items m
-        JOIN restaurants r ON m.restaurant_id = r.id
-        WHERE m.price IS NOT NULL
-          AND m.price <= :budget
-        ORDER BY m.price DESC
-    """
-    df = conn.query(sql, params={"budget": int(budget)}, ttl=60)
+SEARCH_RADIUS_OPTIONS = {"500m": 500, "1km": 1000, "2km": 2000, "5km": 5000, "전체": None}
+
+MENU_COLUMN_CONFIG = {
+    "r_name": "식당 이름",
+    "item_name": "메뉴명",
+    "price": st.column_config.NumberColumn("가격", format="%d원"),
+    "category": "종류",
+    "address": "위치",
+    "distance_m": st.column_config.NumberColumn("거리", format="%dm"),
+    "score": st.column_config.ProgressColumn("추천 점수", format="%.1f", min_value=0, max_value=100),
+    "restaurant_id": None,  # 랭킹용 (화면에서는 숨김)
+}
+
+
+def rank_candidates(df, budget, weather, weights, radius_m=None):
+    """예산 근접도 / 거리 / 별점 / 날씨 궁합으로 후보 정렬 (별점은 메모리 리뷰 인덱스 사용)"""
+    ratings = {rid: v["avg_rating"] for rid, v in dh.get_review_index().items()}
+    return ranking.rank_menu(df, budget, weather, weights, ratings, max_distance_m=radius_m)
+
 
-    if not df.empty and "price" in df.columns:
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
-        df = df.dropna(subset=["price"])
-        df["price"] = df["price"].astype(int)
-    return df
+def fetch_menu_df(budget: int, lat: float = None, lon: float = None, radius_m: int = None):
+    """예산 이하 메뉴 (가격 높은 순) - 메모리의 가격순 카탈로그에서 이분 탐색, DB 조회 없음"""
+    return dh.get_price_index().query(budget, lat, lon, radius_m)
 
 
 @st.cache_data(show_spinner=False, ttl=60)
@@ -116,14 +108,16 @@ def fetch_restaurants_min():
 
 @st.cache_data(show_spinner=False, ttl=60)
 def fetch_restaurant_stats(rest_id: str):
-    """선택 식당 메뉴/리뷰 개수(디버깅용)"""
+    """선택 식당 메뉴/리뷰 개수(디버깅용) - restaurant_stats 요약 테이블에서 조회"""
     sql = """
         SELECT
-            (SELECT COUNT(*) FROM menu_items WHERE restaurant_id = :rest_id) AS menu_cnt,
-            (SELECT COUNT(*)
-             FROM menu_reviews mr
-             JOIN menu_items mi ON mr.menu_item_id = mi.id
-             WHERE mi.restaurant_id = :rest_id) AS review_cnt
+            COALESCE(s.menu_count, 0) AS menu_cnt,
+            COALESCE(s.review_count, 0) AS review_cnt,
+            s.avg_rating,
+            s.last_review_at
+        FROM restaurants r
+        LEFT JOIN restaurant_stats s ON s.restaurant_id = r.id
+        WHERE r.id = :rest_id
     """
     return conn.query(sql, params={"rest_id": rest_id}, ttl=60)
 
@@ -160,6 +154,7 @@ if "tab1" not in st.session_state:
         "searched": False,
         "address": None,
         "budget": None,
+        "radius": "1km",
         "lat": None,
         "lon": None,
         "weather": None,
@@ -167,6 +162,8 @@ if "tab1" not in st.session_state:
         "location_name": "검색 전",
         "df": pd.DataFrame(),
         "rec_text": None,
+        "rec_request": None,
+        "fan_summary": "",
     }
 
 if "tab2" not in st.session_state:
@@ -175,13 +172,16 @@ if "tab2" not in st.session_state:
         "rest_id": None,
         "rest_name": None,
         "result": None,
+        "cached": False,
+        "is_current": False,
+        "review_hash": None,
         "reviews_text": "",
     }
 
 tab1, tab2 = st.tabs(["💰 예산별 맞춤 추천", "📊 리뷰 정밀 분석"])
 
 # =========================================================
-# 탭 1: 예산별 추천 (✅ TOP 5 고정)
+# 탭 1: 예산별 추천 (✅ 랭킹 TOP 5)
 # =========================================================
 with tab1:
     st.markdown("### 💸 내 지갑 사정에 딱 맞는 맛집")
@@ -210,6 +210,22 @@ with tab1:
             )
             budget = int(budget)
 
+            radius_labels = list(SEARCH_RADIUS_OPTIONS.keys())
+            radius_label = st.radio(
+                "검색 반경 📍",
+                radius_labels,
+                index=radius_labels.index(st.session_state.tab1["radius"]),
+                horizontal=True,
+                key="radius_tab1",
+            )
+
+            with st.expander("⚖️ 추천 기준 조정"):
+                weights = {
+                    key: st.slider(ranking.WEIGHT_LABELS[key], 0.0, 1.0, float(default), 0.05, key=f"weight_{key}_tab1")
+                    for key, default in ranking.DEFAULT_WEIGHTS.items()
+                }
+                use_llm = st.checkbox("🤖 AI 추천 멘트 생성", value=True, key="use_llm_tab1")
+
             st.markdown("<div style='margin-top: 20px;'></div>", unsafe_allow_html=True)
 
             st.markdown(
@@ -241,14 +257,46 @@ with tab1:
         user_lat, user_lon = 37.5786, 126.8972
         location_name = address_input
 
-        geo = geocode_address(address_input)
+        radius_m = SEARCH_RADIUS_OPTIONS[radius_label]
+
+        def locate():
+            """주소 -> 좌표 -> 날씨 (날씨는 좌표가 있어야 하므로 한 작업으로 묶음)"""
+            geo = geocode_address(address_input)
+            lat, lon = geo if geo else (user_lat, user_lon)
+            return geo, get_weather_cached(lat, lon)
+
+        with st.spinner("🌞 위치 · 날씨 · 메뉴를 불러오는 중..."):
+            if radius_m is None:
+                # 반경 제한이 없으면 메뉴 조회는 위치와 무관 -> 위치(+날씨)와 메뉴를 동시에
+                fan = fanout.run_parallel({
+                    "location": locate,
+                    "menu": lambda: fetch_menu_df(budget),
+                })
+                geo, weather = fan.get("location", (None, None))
+            else:
+                # 반경 검색은 좌표가 필요 -> 좌표만 먼저 구하고 날씨 / 메뉴를 동시에
+                geo = geocode_address(address_input)
+                if geo:
+                    user_lat, user_lon = geo
+                fan = fanout.run_parallel({
+                    "weather": lambda: get_weather_cached(user_lat, user_lon),
+                    "menu": lambda: fetch_menu_df(budget, user_lat, user_lon, radius_m),
+                })
+                weather = fan.get("weather")
+
         if geo:
             user_lat, user_lon = geo
         else:
             st.toast("📍 위치를 못 찾아서 기본 위치로 검색합니다.", icon="⚠️")
 
-        with st.spinner("🌞오늘 날씨 확인 중..."):
-            weather = get_weather_cached(user_lat, user_lon)
+        df = fan.get("menu")
+        if df is None:
+            st.toast("📦 메뉴를 제때 불러오지 못했어요. 다시 시도해 주세요.", icon="⚠️")
+            df = pd.DataFrame()
+        elif radius_m is None:
+            # 동시에 받은 메뉴 목록은 그대로 쓰고, 좌표 기준 거리만 붙임 (랭킹용)
+            df = dh.get_price_index().add_distance(df, user_lat, user_lon)
+        fan_summary = fan.summary()
 
         weather_summary = ""
         if weather:
@@ -272,30 +320,25 @@ with tab1:
         else:
             weather_summary = "🌥️ 날씨 정보를 가져오지 못했어요. 예산 기반으로 추천할게요."
 
-        with st.spinner("📦 예산에 맞는 메뉴를 불러오는 중..."):
-            df = fetch_menu_df(budget)
 
+        # AI 추천 멘트는 아래 결과 영역에서 스트리밍으로 받음 (여기서는 후보만 준비)
         rec_text = None
+        rec_request = None
         if not df.empty:
-            top5_df = df.sort_values("price", ascending=False).head(5)
-            candidates = top5_df.to_dict("records")
+            top5_df = rank_candidates(df, budget, weather, weights, radius_m).head(5)
 
-            with st.spinner("🤖 AI가 메뉴를 고르는 중..."):
-                try:
-                    if weather:
-                        rec_text = recommend.get_ai_recommendation(weather, candidates, budget)
-                    else:
-                        lines = [f"- {c['r_name']} | {c['item_name']} ({int(c['price']):,}원)" for c in candidates]
-                        rec_text = "예산 안에서 가격이 높은 메뉴 TOP 5를 골랐어요!\n" + "\n".join(lines)
-                except Exception:
-                    lines = [f"- {c['r_name']} | {c['item_name']} ({int(c['price']):,}원)" for c in candidates]
-                    rec_text = "예산 안에서 가격이 높은 메뉴 TOP 5를 골랐어요!\n" + "\n".join(lines)
+            if weather and use_llm:
+                rec_request = {"weather": weather, "candidates": top5_df.to_dict("records"), "budget": budget}
+            else:
+                # LLM 없이 랭킹 결과로 바로 멘트 작성
+                rec_text = ranking.fallback_text(top5_df, weather, budget)
 
         st.session_state.tab1.update(
             {
                 "searched": True,
                 "address": address_input,
                 "budget": budget,
+                "radius": radius_label,
                 "lat": user_lat,
                 "lon": user_lon,
                 "weather": weather,
@@ -303,6 +346,8 @@ with tab1:
                 "location_name": location_name,
                 "df": df,
                 "rec_text": rec_text,
+                "rec_request": rec_request,
+                "fan_summary": fan_summary,
             }
         )
 
@@ -339,21 +384,26 @@ with tab1:
 
         df = st.session_state.tab1["df"]
         budget = st.session_state.tab1["budget"]
+        if st.session_state.tab1.get("fan_summary"):
+            st.caption(st.session_state.tab1["fan_summary"])
 
         if df.empty:
-            st.error("😭 해당 예산으로는 먹을 수 있는 메뉴가 없어요...")
+            st.error("😭 해당 예산(과 검색 반경)으로는 먹을 수 있는 메뉴가 없어요...")
         else:
-            if st.session_state.tab1["rec_text"]:
-                st.markdown(
-                    f"""
-                <div style="background-color:#e8f4f8; padding:15px; border-radius:10px;
-                            border-left: 5px solid #00a8cc; margin-bottom: 20px;">
-                    <h4 style="color:#007ea7;">🤖 AI's Pick</h4>
-                    <p style="font-size:16px; white-space: pre-wrap;">{st.session_state.tab1["rec_text"]}</p>
-                </div>
-                """,
-                    unsafe_allow_html=True,
-                )
+            rec_request = st.session_state.tab1.get("rec_request")
+            if rec_request or st.session_state.tab1["rec_text"]:
+                with st.container(border=True):
+                    st.markdown("#### 🤖 AI's Pick")
+                    if rec_request:
+                        # 첫 토큰부터 바로 보여주고, 다 받으면 세션에 저장 (다음 rerun부터는 저장된 글)
+                        rec_text = st.write_stream(
+                            recommend.stream_ai_recommendation(
+                                rec_request["weather"], rec_request["candidates"], rec_request["budget"]
+                            )
+                        )
+                        st.session_state.tab1.update({"rec_text": rec_text, "rec_request": None})
+                    else:
+                        st.markdown(st.session_state.tab1["rec_text"])
 
             with st.container(border=True):
                 st.subheader("🎛️ 결과 필터 (선택)")
@@ -363,18 +413,17 @@ with tab1:
                 )
 
             df_f = df[df["category"].isin(sel_categories)] if sel_categories else df
-            df_top5 = df_f.sort_values("price", ascending=False).head(5)
+            # 가중치를 바꾸면 다시 검색하지 않아도 바로 재정렬
+            df_f = rank_candidates(
+                df_f, budget, st.session_state.tab1["weather"], weights,
+                SEARCH_RADIUS_OPTIONS[st.session_state.tab1["radius"]],
+            )
+            df_top5 = df_f.head(5)
 
-            st.subheader("🏆 예산 꽉 채운 추천 TOP 5")
+            st.subheader("🏆 맞춤 추천 TOP 5")
             st.dataframe(
                 df_top5,
-                column_config={
-                    "r_name": "식당 이름",
-                    "item_name": "메뉴명",
-                    "price": st.column_config.NumberColumn("가격", format="%d원"),
-                    "category": "종류",
-                    "address": "위치",
-                },
+                column_config=MENU_COLUMN_CONFIG,
                 use_container_width=True,
                 hide_index=True,
             )
@@ -388,7 +437,7 @@ with tab1:
                 y="item_name",
                 color="category",
                 orientation="h",
-                title=f"💰 예산({budget:,}원) 꽉 채운 추천 메뉴 TOP {len(df_top5)}",
+                title=f"💰 예산({budget:,}원) 맞춤 추천 메뉴 TOP {len(df_top5)}",
                 labels={"price": "가격 (원)", "item_name": "메뉴명"},
                 text="price",
                 hover_data=["r_name", "category", "address"],
@@ -409,13 +458,7 @@ with tab1:
             with st.expander(f"📋 전체 검색 결과 보기 ({len(df_f)}개)"):
                 st.dataframe(
                     df_f,
-                    column_config={
-                        "r_name": "식당 이름",
-                        "item_name": "메뉴명",
-                        "price": st.column_config.NumberColumn("가격", format="%d원"),
-                        "category": "종류",
-                        "address": "위치",
-                    },
+                    column_config=MENU_COLUMN_CONFIG,
                     use_container_width=True,
                     hide_index=True,
                 )
@@ -440,40 +483,62 @@ with tab2:
         selected_rest_name = st.selectbox("분석할 식당을 선택하세요", rest_names, key="rest_select_tab2")
         selected_rest_id = df_rest.loc[df_rest["name"] == selected_rest_name, "id"].iloc[0]
 
+        # 통계 / 리뷰 조회를 동시에
+        fan2 = fanout.run_parallel({
+            "stats": lambda: fetch_restaurant_stats(selected_rest_id),
+            "reviews": lambda: fetch_reviews_by_restaurant(selected_rest_id),
+        })
+
         with st.expander("🔎 선택 식당 데이터 상태 확인 (Debug)"):
+            st.caption(fan2.summary())
             try:
-                s = fetch_restaurant_stats(selected_rest_id).iloc[0]
-                st.write({"menu_cnt": int(s["menu_cnt"]), "review_cnt": int(s["review_cnt"])})
+                if "stats" not in fan2.values:
+                    raise fan2.errors.get("stats") or TimeoutError("시간 초과")
+                s = fan2.get("stats").iloc[0]
+                st.write({
+                    "menu_cnt": int(s["menu_cnt"]),
+                    "review_cnt": int(s["review_cnt"]),
+                    "avg_rating": None if pd.isna(s["avg_rating"]) else float(s["avg_rating"]),
+                    "last_review_at": None if pd.isna(s["last_review_at"]) else str(s["last_review_at"]),
+                })
             except Exception as e:
                 st.write(f"디버그 정보 로드 실패: {e}")
 
-        review_btn = st.button("리뷰 분석 시작 ✨", key="review_btn_tab2")
+        # 미리 계산된 결과(manage.py analyze-reviews)를 먼저 보여주고,
+        # 없거나 리뷰가 바뀐 경우에만 버튼으로 실시간 분석
+        reviews_df = fan2.get("reviews")
+        if reviews_df is None:
+            st.error(f"리뷰 로딩 실패: {fan2.errors.get('reviews') or '시간 초과'}")
+            reviews_df = pd.DataFrame(columns=["review_id", "comment"])
+
+        review_hash = review_analysis.review_set_hash(reviews_df)
+        if (st.session_state.tab2.get("rest_id"), st.session_state.tab2.get("review_hash")) != (selected_rest_id, review_hash):
+            precomputed, is_current = review_analysis.get_precomputed(selected_rest_id, reviews_df)
+            st.session_state.tab2.update(
+                {"analyzed": True, "rest_id": selected_rest_id, "rest_name": selected_rest_name,
+                 "review_hash": review_hash,
+                 "reviews_text": review_analysis.reviews_text_of(reviews_df),
+                 "result": precomputed, "cached": True, "is_current": is_current}
+            )
+
+        if not st.session_state.tab2.get("is_current"):
+            if st.session_state.tab2.get("result") is not None:
+                st.caption("ℹ️ 최근 추가된 리뷰가 아직 반영되지 않은 분석 결과입니다.")
+            review_btn = st.button("리뷰 분석 시작 ✨", key="review_btn_tab2")
+        else:
+            review_btn = False
 
         if review_btn:
             try:
-                reviews_df = fetch_reviews_by_restaurant(selected_rest_id)
-
-                if reviews_df.empty:
-                    st.session_state.tab2.update(
-                        {"analyzed": True, "rest_id": selected_rest_id, "rest_name": selected_rest_name,
-                         "result": None, "reviews_text": ""}
+                # 리뷰가 그대로면 저장된 분석 결과를 바로 사용 (OpenAI 호출 없음)
+                with st.spinner("💭 AI가 손님들의 마음을 읽고 있어요..."):
+                    result, cached = review_analysis.analyze_restaurant(
+                        selected_rest_id, selected_rest_name, reviews_df
                     )
-                else:
-                    valid_comments = reviews_df["comment"].dropna().astype(str).tolist()
-                    reviews_text = " ".join(valid_comments)
-
-                    st.session_state.tab2.update(
-                        {"analyzed": True, "rest_id": selected_rest_id, "rest_name": selected_rest_name,
-                         "reviews_text": reviews_text}
-                    )
-
-                    if reviews_text.strip():
-                        with st.spinner("💭 AI가 손님들의 마음을 읽고 있어요..."):
-                            result = recommend.get_review_analysis(selected_rest_name, reviews_text)
-                        st.session_state.tab2["result"] = result
-                    else:
-                        st.session_state.tab2["result"] = None
-
+                st.session_state.tab2.update(
+                    {"result": result, "cached": cached,
+                     "is_current": result is not None and not result.get("error")}
+                )
             except Exception as e:
                 st.error(f"리뷰 분석 중 오류 발생: {e}")
 
@@ -485,8 +550,14 @@ with tab2:
             if not reviews_text.strip():
                 st.info("리뷰 텍스트가 없습니다. (리뷰는 있으나 내용이 비어있거나, 리뷰가 0개입니다.)")
             elif result is None:
-                st.warning("분석 결과 생성에 실패했습니다.")
+                st.info("아직 분석 결과가 없습니다. 버튼을 눌러 분석해 보세요.")
             else:
+                cache_stats = review_analysis.get_cache_stats()
+                st.caption(
+                    ("⚡ 저장된 분석 결과" if st.session_state.tab2.get("cached") else "🆕 새로 분석한 결과")
+                    + f" · 캐시 적중 {cache_stats['hits']} / 미스 {cache_stats['misses']}"
+                    + f" / 실패 {cache_stats['failures']}"
+                )
                 col_chart, col_summary = st.columns([1.2, 0.8])
 
                 with col_chart:
@@ -538,23 +609,12 @@ with tab2:
                     st.code(MAL_FONT)
                 else:
                     try:
-                        x, y = np.ogrid[:300, :300]
-                        mask = (x - 150) ** 2 + (y - 150) ** 2 > 130**2
-                        mask = 255 * mask.astype(int)
-
-                        wc = WordCloud(
-                            font_path=font_path,
-                            background_color="white",
-                            mask=mask,
-                            width=300,
-                            height=300,
-                            max_font_size=80,
-                            prefer_horizontal=0.8,
-                            collocations=False,
-                        ).generate(reviews_text)
-
-                        top_keywords = sorted(wc.words_.items(), key=lambda t: t[1], reverse=True)[:3]
-                        top_keywords_str = " ".join([f"#{k}" for k, _ in top_keywords])
+                        # 별도 프로세스에서 렌더링, 리뷰 집합 해시 기준 캐시
+                        with st.spinner("☁️ 워드클라우드 그리는 중..."):
+                            wc_png, top_keywords = wordcloud_render.get_wordcloud(
+                                st.session_state.tab2["review_hash"], reviews_text, font_path
+                            )
+                        top_keywords_str = " ".join([f"#{k}" for k in top_keywords])
 
                         st.markdown(
                             f"""
@@ -568,11 +628,7 @@ with tab2:
 
                         c1, c2, c3 = st.columns([1, 2, 1])
                         with c2:
-                            fig_wc, ax = plt.subplots(figsize=(5, 5))
-                            ax.imshow(wc, interpolation="bilinear")
-                            ax.axis("off")
-                            plt.tight_layout(pad=0)
-                            st.pyplot(fig_wc)
+                            st.image(wc_png, use_container_width=True)
 
                     except Exception as e:
                         st.warning(f"워드 클라우드 생성 실패: {e}")
@@ -580,7 +636,7 @@ with tab2:
                 # 원본 데이터 확인
                 with st.expander("📋 리뷰 원본 데이터 확인하기"):
                     try:
-                        raw_df = fetch_reviews_by_restaurant(selected_rest_id)
+                        raw_df = reviews_df
                         if raw_df.empty:
                             st.info("데이터가 없습니다.")
                         else:
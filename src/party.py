@@ -3,7 +3,11 @@ import pandas as pd
 from datetime import datetime, timedelta, timezone
 import data_handler as dh  # DB 핸들러 임포트
 
-@st.fragment
+# 다른 사람의 참여/나가기가 보이도록 주기적으로 다시 그림
+# (매번 DB를 읽지 않고 parties_version이 바뀐 경우에만 스냅샷을 다시 가져옴)
+PARTY_POLL_SECONDS = 5
+
+@st.fragment(run_every=PARTY_POLL_SECONDS)
 def render_party_sidebar(current_user_id: str):
     """
     current_user_id: 로그인한 유저의 DB상 UUID
@@ -49,21 +53,16 @@ def render_party_sidebar(current_user_id: str):
 
         st.markdown("---")
 
-    # --- 공통 데이터: 맛집 리스트 ---
-    restaurants_df = dh.get_all_restaurants()
-    rest_map = {}
-    if not restaurants_df.empty:
-        rest_map = {
-            f"{row['name']} ({row['category']})": row['id'] 
-            for _, row in restaurants_df.iterrows()
-        }
+    # --- 공통 데이터: 파티 / 참여자 / 맛집 목록 (한 번에 캐시된 스냅샷) ---
+    snapshot = dh.get_party_snapshot()
+    rest_map = snapshot.rest_labels
     id_to_name_map = {v: k for k, v in rest_map.items()}
 
     # --- 2. 원정대 등록 폼 ---
     if st.session_state.get("party_form_open"):
         st.subheader("새 원정대 만들기")
         
-        if restaurants_df.empty:
+        if not rest_map:
             st.warning("등록된 맛집이 없습니다.")
         else:
             with st.form("party_registration_form"):
@@ -73,27 +72,28 @@ def render_party_sidebar(current_user_id: str):
                 
                 if st.form_submit_button("등록 완료"):
                     rest_id = rest_map[selected_label]
-                    dh.create_party(rest_id, current_user_id, max_people, is_anonymous)
-                    st.success("원정대가 등록되었습니다!")
-                    st.session_state.party_form_open = False
-                    st.session_state.show_party_list = True
-                    st.rerun()
+                    if dh.create_party(rest_id, current_user_id, max_people, is_anonymous):
+                        st.success("원정대가 등록되었습니다!")
+                        st.session_state.party_form_open = False
+                        st.session_state.show_party_list = True
+                        st.rerun()
 
     # --- 3. 원정대 목록 및 상세/수정 ---
     if st.session_state.get("show_party_list"):
         st.subheader("🔥 오늘의 원정대")
-        parties_df = dh.get_active_parties()
-        
-        if not parties_df.empty:
-            parties_df['display'] = parties_df.apply(
-                lambda x: f"[{x['restaurant_name']}] ({x['current_people']}/{x['max_people']})", axis=1
+        parties = snapshot.parties
+
+        if parties:
+            # 인원이 바뀌어도 선택이 유지되도록 옵션은 party_id로 두고 표시만 바꿈
+            selected_party_id = st.selectbox(
+                "참여할 원정대 선택",
+                list(parties.keys()),
+                format_func=lambda pid: (
+                    f"[{parties[pid]['restaurant_name']}] "
+                    f"({parties[pid]['current_people']}/{parties[pid]['max_people']})"
+                ),
             )
-            party_map = dict(zip(parties_df['display'], parties_df['id']))
-            
-            selected_display = st.selectbox("참여할 원정대 선택", list(party_map.keys()))
-            selected_party_id = party_map[selected_display]
-            
-            row = parties_df[parties_df['id'] == selected_party_id].iloc[0]
+            row = parties[selected_party_id]
             
             st.markdown("---")
 
@@ -155,17 +155,17 @@ def render_party_sidebar(current_user_id: str):
                 st.write(f"👥 **인원:** {row['current_people']} / {row['max_people']}명")
                 st.caption(f"개설: {pd.to_datetime(row['created_at']).strftime('%H:%M')}")
 
-                participants_df = dh.get_party_participants(selected_party_id)
-                participant_ids = participants_df['id'].tolist()
-                
+                participants = snapshot.participants.get(selected_party_id, [])
+                participant_ids = [p['id'] for p in participants]
+
                 display_names = []
-                for idx, p_row in participants_df.iterrows():
-                    if p_row['id'] == current_user_id:
-                        display_names.append(f"{p_row['name']}(나)")
+                for idx, p in enumerate(participants):
+                    if p['id'] == current_user_id:
+                        display_names.append(f"{p['name']}(나)")
                     elif row['is_anonymous'] and not is_past_reveal_time:
                         display_names.append(f"익명{idx+1}")
                     else:
-                        display_names.append(p_row['name'])
+                        display_names.append(p['name'])
                 
                 st.info("참여자: " + ", ".join(display_names))
 
@@ -188,12 +188,12 @@ def render_party_sidebar(current_user_id: str):
                     with col1:
                         if not is_joined and not is_full:
                             if st.button("✅ 참여하기", key=f"join_{selected_party_id}"):
-                                success, msg = dh.join_party(selected_party_id, current_user_id)
-                                if success:
-                                    st.success(msg)
+                                result = dh.join_party(selected_party_id, current_user_id)
+                                if result.ok:
+                                    st.success(result.message)
                                     st.rerun()
                                 else:
-                                    st.error(msg)
+                                    st.error(result.message)
                                     
                         elif is_full and not is_joined:
                             st.button("⛔ 만원", disabled=True, key=f"full_{selected_party_id}")
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+import geo_index
+
+# =============================================================================
+# 가격순 메뉴 카탈로그
+# - 조인 캐시의 메뉴를 가격 오름차순 배열로 한 번만 정리해 둡니다.
+# - 예산 조회는 이분 탐색(searchsorted)으로 경계를 찾고 잘라내기만 하므로 DB를 타지 않습니다.
+# - 반경 검색은 restaurants.geohash를 정렬해 둔 배열에서 반경을 덮는 셀 접두사 구간만 꺼내고,
+#   그 후보만 하버사인 거리로 판정합니다 (예산 구간 전체를 훑지 않음).
+# - 데이터 버전이 바뀔 때만 다시 만듭니다 (data_handler.get_price_index).
+# =============================================================================
+
+MENU_COLUMNS = ["r_name", "category", "item_name", "price", "address"]
+
+
+class PriceIndex:
+    """가격 오름차순으로 정렬된 메뉴 배열 묶음"""
+
+    def __init__(self, menus):
+        menus = menus.sort_values("price", kind="stable").reset_index(drop=True)
+        self.size = len(menus)
+        self.prices = menus["price"].to_numpy(dtype=np.int64)
+        self.lats = menus["lat"].to_numpy(dtype=float)
+        self.lons = menus["lon"].to_numpy(dtype=float)
+        self.restaurant_ids = menus["restaurant_id"].to_numpy(dtype=object)
+        self.restaurant_coords = menus.drop_duplicates("restaurant_id").set_index("restaurant_id")[["lat", "lon"]]
+        self.columns = {col: menus[col].to_numpy(dtype=object) for col in MENU_COLUMNS if col != "price"}
+
+        # 지오해시 순으로 정렬한 위치 -> 접두사 검색은 이분 탐색 두 번으로 구간을 찾음 (좌표 없는 메뉴는 "")
+        geohashes = menus["geohash"].fillna("").astype(str).to_numpy(dtype="U")
+        self.geo_order = np.argsort(geohashes, kind="stable")
+        self.geo_sorted = geohashes[self.geo_order]
+
+    def budget_slice(self, budget):
+        """예산 이하 메뉴의 위치 (가격 오름차순 배열에서 [0, cut))"""
+        return int(np.searchsorted(self.prices, int(budget), side="right"))
+
+    def positions_in_cells(self, prefixes):
+        """지오해시 접두사 목록에 속한 메뉴 위치 (가격 오름차순 배열 기준, 정렬 안 됨)"""
+        chunks = []
+        for prefix in prefixes:
+            lo = np.searchsorted(self.geo_sorted, prefix, side="left")
+            hi = np.searchsorted(self.geo_sorted, prefix + "~", side="left")  # "~"는 BASE32 문자보다 뒤
+            chunks.append(self.geo_order[lo:hi])
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def query_positions(self, budget, lat=None, lon=None, radius_m=None, top_k=None):
+        """
+        예산 이하(+ 반경 안) 메뉴 위치를 가격 높은 순으로 반환합니다.
+
+        Returns:
+            (np.ndarray, np.ndarray | None): (위치 배열, 거리(m) 배열 - 기준 좌표가 없으면 None)
+        """
+        cut = self.budget_slice(budget)
+        positions = np.arange(cut - 1, -1, -1)  # 가격 높은 순
+        distances = None
+
+        if lat is not None and lon is not None:
+            if radius_m:
+                # 반경을 덮는 지오해시 셀의 메뉴 중 예산 이하만 남기고 가격 높은 순으로
+                candidates = self.positions_in_cells(geo_index.covering_cells(lat, lon, radius_m))
+                positions = np.unique(candidates[candidates < cut])[::-1]
+            distances = geo_index.haversine_m(lat, lon, self.lats[positions], self.lons[positions])
+            if radius_m:
+                within = distances <= radius_m
+                positions, distances = positions[within], distances[within]
+
+        if top_k is not None:
+            positions = positions[:top_k]
+            if distances is not None:
+                distances = distances[:top_k]
+        return positions, distances
+
+    def query(self, budget, lat=None, lon=None, radius_m=None, top_k=None):
+        """
+        예산 이하 메뉴를 가격 높은 순 DataFrame으로 반환합니다.
+        기준 좌표가 주어지면 distance_m 컬럼이 추가됩니다 (좌표 없는 식당은 NaN).
+        """
+        positions, distances = self.query_positions(budget, lat, lon, radius_m, top_k)
+        data = {col: self.columns[col][positions] for col in MENU_COLUMNS if col != "price"}
+        data["price"] = self.prices[positions]
+        df = pd.DataFrame(data, columns=MENU_COLUMNS)
+        df["restaurant_id"] = self.restaurant_ids[positions]
+        if distances is not None:
+            df["distance_m"] = np.round(distances)
+        return df
+
+    def add_distance(self, df, lat, lon):
+        """
+        이미 조회한 메뉴 DataFrame에 기준 좌표까지의 distance_m 컬럼을 붙입니다 (다시 조회하지 않음).
+        좌표 없는 식당은 NaN.
+        """
+        df = df.copy()
+        coords = self.restaurant_coords.reindex(df["restaurant_id"])
+        distances = geo_index.haversine_m(lat, lon, coords["lat"].to_numpy(dtype=float), coords["lon"].to_numpy(dtype=float))
+        df["distance_m"] = np.round(distances)
+        return df
+
+
+def build_price_index(df):
+    """조인 DataFrame -> PriceIndex (메뉴 하나당 한 행, 가격 없는 메뉴 제외)"""
+    if df is None or df.empty:
+        menus = pd.DataFrame(columns=["restaurant_id", "lat", "lon", "geohash"] + MENU_COLUMNS)
+    else:
+        menus = df.dropna(subset=["menu_item_id"]).drop_duplicates(subset=["menu_item_id"])
+        menus = menus.rename(columns={"restaurant_name": "r_name"})
+        if "geohash" not in menus.columns:
+            menus["geohash"] = None
+        menus = menus[["restaurant_id", "lat", "lon", "geohash"] + MENU_COLUMNS].copy()
+        # 아직 geohash가 비어 있는 맛집(backfill-geohash 전)은 좌표로 바로 계산
+        missing = menus["geohash"].isna()
+        if missing.any():
+            menus.loc[missing, "geohash"] = geo_index.fill_geohash(menus[missing])
+        menus["price"] = pd.to_numeric(menus["price"], errors="coerce")
+        menus = menus.dropna(subset=["price"])
+    menus["price"] = menus["price"].astype(np.int64)
+    return PriceIndex(menus)
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# 메뉴 추천 랭킹
+# - 예산 근접도 / 거리 / 평균 별점 / 날씨-카테고리 궁합을 0~1로 정규화해 가중합합니다.
+# - 후보 전체를 NumPy 한 번으로 계산하므로 LLM 없이도 바로 순위를 낼 수 있습니다.
+# =============================================================================
+
+DEFAULT_WEIGHTS = {"budget": 0.4, "distance": 0.2, "rating": 0.25, "weather": 0.15}
+WEIGHT_LABELS = {"budget": "💸 예산 근접도", "distance": "📍 가까운 거리", "rating": "⭐ 별점", "weather": "🌤️ 날씨 궁합"}
+
+NEUTRAL_SCORE = 0.5  # 정보가 없을 때 (리뷰 없는 식당, 위치 모름 등)
+
+# 날씨 상태별 카테고리 궁합 (0~1)
+WEATHER_AFFINITY = {
+    "rain": {"한식": 1.0, "중식": 0.9, "일식": 0.7, "양식": 0.5, "카페/디저트": 0.4, "기타": 0.5},
+    "snow": {"한식": 1.0, "중식": 0.8, "일식": 0.7, "양식": 0.6, "카페/디저트": 0.6, "기타": 0.5},
+    "cold": {"한식": 1.0, "중식": 0.8, "일식": 0.8, "양식": 0.6, "카페/디저트": 0.5, "기타": 0.5},
+    "hot":  {"한식": 0.6, "중식": 0.4, "일식": 1.0, "양식": 0.6, "카페/디저트": 0.9, "기타": 0.5},
+    "mild": {"한식": 0.7, "중식": 0.7, "일식": 0.7, "양식": 0.8, "카페/디저트": 0.8, "기타": 0.6},
+}
+WEATHER_REASONS = {
+    "rain": "비 오는 날 따끈한 한 그릇",
+    "snow": "눈 오는 날 든든한 식사",
+    "cold": "추운 날 몸을 녹여 줄 메뉴",
+    "hot": "더운 날 가볍고 시원하게",
+    "mild": "나들이하기 좋은 날씨",
+}
+
+
+def weather_condition(weather):
+    """recommend.get_weather 결과 -> rain / snow / cold / hot / mild"""
+    if not weather:
+        return None
+    main = str(weather.get("main", ""))
+    temp = weather.get("temp")
+    if any(k in main for k in ("비", "소나기", "천둥")):
+        return "rain"
+    if "눈" in main:
+        return "snow"
+    if temp is not None and temp < 5:
+        return "cold"
+    if temp is not None and temp > 28:
+        return "hot"
+    return "mild"
+
+
+def normalize_weights(weights):
+    """음수는 0으로, 합이 1이 되도록 (모두 0이면 기본값)"""
+    w = {k: max(0.0, float(weights.get(k, 0))) for k in DEFAULT_WEIGHTS}
+    total = sum(w.values())
+    if total <= 0:
+        return dict(DEFAULT_WEIGHTS)
+    return {k: v / total for k, v in w.items()}
+
+
+def score_candidates(prices, budget, categories, distances_m=None, ratings=None,
+                     condition=None, weights=None, max_distance_m=None):
+    """
+    후보 배열 전체의 점수와 항목별 점수를 한 번에 계산합니다.
+
+    Returns:
+        (np.ndarray, dict[str, np.ndarray]): (최종 점수, 항목별 0~1 점수)
+    """
+    w = normalize_weights(weights or DEFAULT_WEIGHTS)
+    n = len(prices)
+    prices = np.asarray(prices, dtype=float)
+
+    parts = {"budget": np.clip(prices / max(float(budget), 1.0), 0.0, 1.0)}
+
+    if distances_m is not None:
+        d = np.asarray(distances_m, dtype=float)
+        scale = max_distance_m or (np.nanmax(d) if n and np.isfinite(d).any() else 1.0)
+        parts["distance"] = np.where(np.isnan(d), NEUTRAL_SCORE, 1.0 - np.clip(d / max(scale, 1.0), 0.0, 1.0))
+    else:
+        parts["distance"] = np.full(n, NEUTRAL_SCORE)
+
+    if ratings is not None:
+        r = np.asarray(ratings, dtype=float)
+        parts["rating"] = np.where(np.isnan(r), NEUTRAL_SCORE, np.clip((r - 1.0) / 4.0, 0.0, 1.0))
+    else:
+        parts["rating"] = np.full(n, NEUTRAL_SCORE)
+
+    affinity = WEATHER_AFFINITY.get(condition)
+    if affinity:
+        parts["weather"] = pd.Series(categories, dtype=object).map(affinity).fillna(NEUTRAL_SCORE).to_numpy(float)
+    else:
+        parts["weather"] = np.full(n, NEUTRAL_SCORE)
+
+    score = sum(w[k] * parts[k] for k in DEFAULT_WEIGHTS)
+    return score, parts
+
+
+def rank_menu(df, budget, weather=None, weights=None, rating_by_restaurant=None, max_distance_m=None):
+    """
+    메뉴 후보 DataFrame에 score 컬럼을 붙여 점수 높은 순으로 정렬합니다.
+    df에는 price, category 컬럼이 필요하고, distance_m / restaurant_id 가 있으면 함께 반영합니다.
+    """
+    if df.empty:
+        return df.assign(score=pd.Series(dtype=float))
+
+    ratings = None
+    if rating_by_restaurant is not None and "restaurant_id" in df.columns:
+        ratings = df["restaurant_id"].map(rating_by_restaurant).to_numpy(float)
+    distances = df["distance_m"].to_numpy(float) if "distance_m" in df.columns else None
+
+    score, _ = score_candidates(
+        df["price"].to_numpy(float), budget, df["category"].to_numpy(object),
+        distances_m=distances, ratings=ratings, condition=weather_condition(weather),
+        weights=weights, max_distance_m=max_distance_m,
+    )
+    ranked = df.assign(score=np.round(score * 100, 1))
+    return ranked.sort_values(["score", "price"], ascending=[False, False], kind="stable")
+
+
+def fallback_text(ranked_top, weather=None, budget=None):
+    """LLM 없이 만드는 추천 멘트 (랭킹 1위 + 나머지 후보 목록)"""
+    if ranked_top.empty:
+        return ""
+    best = ranked_top.iloc[0]
+    condition = weather_condition(weather)
+
+    reasons = []
+    if budget:
+        reasons.append(f"예산 {int(budget):,}원 중 {int(best['price']):,}원")
+    if "distance_m" in ranked_top.columns and pd.notna(best.get("distance_m")):
+        reasons.append(f"{int(best['distance_m']):,}m 거리")
+    if condition and WEATHER_AFFINITY[condition].get(best["category"], 0) >= 0.8:
+        reasons.append(WEATHER_REASONS[condition])
+
+    lines = [f"오늘의 1순위는 **{best['r_name']}**의 **{best['item_name']}**! ({', '.join(reasons)})"]
+    for _, row in ranked_top.iloc[1:].iterrows():
+        lines.append(f"- {row['r_name']} | {row['item_name']} ({int(row['price']):,}원)")
+    return "\n".join(lines)
@@ -1,6 +1,9 @@
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import threading
+import time
 from openai import OpenAI
 
 # 1. secrets.toml에서 OpenAI 키만 가져오기 (날씨 키 필요 없음!)
@@ -39,6 +42,12 @@ def get_wmo_description(code):
     else: 
         return "흐림 ☁️"
 
+# 연결을 재사용하는 공유 세션 (매 요청마다 TCP/TLS 핸드셰이크 하지 않도록)
+WEATHER_TIMEOUT = (2, 3)  # (연결, 읽기) 초
+_http = requests.Session()
+_http.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=10))
+
+
 def get_weather(lat, lon):
     """
     Open-Meteo API를 사용하여 날씨 정보 가져오기 (API Key 불필요)
@@ -47,7 +56,7 @@ def get_weather(lat, lon):
     url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true"
     
     try:
-        response = requests.get(url)
+        response = _http.get(url, timeout=WEATHER_TIMEOUT)
         if response.status_code == 200:
             data = response.json()
             current = data['current_weather']
@@ -67,13 +76,70 @@ def get_weather(lat, lon):
     return None
 
 # ---------------------------------------------------------
-# 🤖 OpenAI 기능 관련 함수들
+# 🗺️ 날씨 캐시 (약 1km 격자 x 10분 단위)
+# - 가까운 위치의 사용자는 같은 격자 칸의 날씨를 함께 씁니다.
+# - 10분이 지난 값은 일단 그대로 돌려주고, 백그라운드에서 새로 받아옵니다.
 # ---------------------------------------------------------
+WEATHER_GRID_DEG = 0.01        # 격자 한 칸 (위도 기준 약 1.1km)
+WEATHER_BUCKET_SECONDS = 600   # 이 시간 단위 안에서는 같은 값을 사용
+WEATHER_STALE_MAX = 60 * 60    # 이보다 오래된 값은 버리고 새로 받아옴
 
-def get_ai_recommendation(weather_info, candidates, user_budget):
+_weather_cache = {}            # 격자 칸 -> (받은 시각, 날씨 dict)
+_weather_refreshing = set()    # 지금 백그라운드에서 받아오는 중인 격자 칸
+_weather_lock = threading.Lock()
+
+
+def _weather_cell(lat, lon):
+    return round(lat / WEATHER_GRID_DEG), round(lon / WEATHER_GRID_DEG)
+
+
+def _fetch_weather_cell(cell):
+    """격자 칸 중심 좌표의 날씨를 받아 캐시에 넣습니다. (실패하면 기존 값 유지)"""
+    weather = get_weather(round(cell[0] * WEATHER_GRID_DEG, 4), round(cell[1] * WEATHER_GRID_DEG, 4))
+    with _weather_lock:
+        if weather:
+            _weather_cache[cell] = (time.time(), weather)
+        _weather_refreshing.discard(cell)
+    return weather
+
+
+def _refresh_in_background(cell):
+    """같은 칸을 동시에 여러 번 받아오지 않도록 한 번만 예약"""
+    with _weather_lock:
+        if cell in _weather_refreshing:
+            return
+        _weather_refreshing.add(cell)
+    threading.Thread(target=_fetch_weather_cell, args=(cell,), name="weather-refresh", daemon=True).start()
+
+
+def get_weather_cached(lat, lon):
     """
-    [기능 1] 날씨와 예산 근접도를 고려한 AI 추천 멘트 생성
+    격자/시간 단위로 캐시된 날씨. 캐시가 비어 있을 때만 API 응답을 기다립니다.
     """
+    cell = _weather_cell(lat, lon)
+    now = time.time()
+    with _weather_lock:
+        entry = _weather_cache.get(cell)
+
+    if entry:
+        fetched_at, weather = entry
+        if int(fetched_at // WEATHER_BUCKET_SECONDS) == int(now // WEATHER_BUCKET_SECONDS):
+            return weather
+        if now - fetched_at < WEATHER_STALE_MAX:
+            _refresh_in_background(cell)
+            return weather
+
+    with _weather_lock:
+        _weather_refreshing.add(cell)
+    return _fetch_weather_cell(cell)
+
+
+# ---------------------------------------------------------
+# 🤖 OpenAI 기능 관련 함수들
+# ---------------------------------------------------------
+
+def _recommendation_messages(weather_info, candidates, user_budget):
+    """추천 멘트 요청 메시지 (일반 / 스트리밍 호출 공용)"""
     # 1. 메뉴 데이터 정리 (예산 근접도를 위해 가격 정보 강조)
     menu_str = ""
     for idx, c in enumerate(candidates[:10]):
@@ -113,13 +179,19 @@ def get_ai_recommendation(weather_info, candidates, user_budget):
     {menu_str}
     """
     
+    return [
+        {"role": "system", "content": system_instruction},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def get_ai_recommendation(weather_info, candidates, user_budget):
+    """
+    [기능 1] 날씨와 예산 근접도를 고려한 AI 추천 멘트 생성
+    """
     try:
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_instruction},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=_recommendation_messages(weather_info, candidates, user_budget),
             temperature=0.7,
             max_tokens=400
         )
@@ -127,16 +199,36 @@ def get_ai_recommendation(weather_info, candidates, user_budget):
     except Exception as e:
         return f"추천 멘트 생성 중 오류가 발생했어요: {e}"
 
-def get_review_analysis(rest_name, reviews_text):
+def stream_ai_recommendation(weather_info, candidates, user_budget):
     """
-    [기능 2] 리뷰 텍스트를 분석하여 5각형 그래프용 점수와 요약 반환
+    [기능 1] 추천 멘트를 받는 대로 조각(str)씩 내보내는 제너레이터 (st.write_stream 용)
     """
-    # 너무 긴 리뷰는 잘라서 보냄 (비용 절약)
-    safe_reviews = reviews_text[:3000]
-    
+    try:
+        stream = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=_recommendation_messages(weather_info, candidates, user_budget),
+            temperature=0.7,
+            max_tokens=400,
+            stream=True
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        yield f"\n\n추천 멘트 생성 중 오류가 발생했어요: {e}"
+
+def analyze_reviews_raw(rest_name, reviews_text):
+    """
+    리뷰 분석 API 호출 (실패하면 예외를 그대로 올림 - 배치 작업의 재시도용)
+    reviews_text는 한 번에 보낼 수 있는 길이여야 합니다 (review_analysis.chunk_reviews 참고).
+
+    Returns:
+        (dict, int): (분석 결과, 사용한 토큰 수)
+    """
+    # 길이 제한은 호출하는 쪽(review_analysis의 청크 분할)에서 지킴
     prompt = f"""
     식당 이름: {rest_name}
-    리뷰 데이터: "{safe_reviews}"
+    리뷰 데이터: "{reviews_text}"
     
     위 리뷰를 분석해서 5가지 항목(맛, 가성비, 서비스, 위생, 분위기)에 대해 1~10점 점수를 매기고,
     전체적인 내용을 요약한 한줄평을 작성해줘.
@@ -148,15 +240,59 @@ def get_review_analysis(rest_name, reviews_text):
     }}
     """
     
+    response = client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.5, # 분석 일관성을 위해 낮게 설정
+        response_format={"type": "json_object"} # JSON 모드 활성화 (안정성 UP)
+    )
+    result = json.loads(response.choices[0].message.content)
+    if len(result.get("scores", [])) != 5 or "summary" not in result:
+        raise ValueError(f"예상과 다른 응답 형식: {result}")
+    tokens = response.usage.total_tokens if response.usage else 0
+    return result, tokens
+
+def merge_review_summaries(rest_name, summaries):
+    """
+    청크별 한줄평 여러 개를 하나의 한줄평으로 합치기 (실패하면 예외)
+
+    Returns:
+        (str, int): (한줄평, 사용한 토큰 수)
+    """
+    summary_lines = "\n".join(f"- {s}" for s in summaries)
+    prompt = f"""
+    식당 이름: {rest_name}
+    아래는 이 식당 리뷰를 기간별로 나눠 요약한 한줄평들이야 (위쪽이 오래된 리뷰):
+    {summary_lines}
+    
+    최근 리뷰의 분위기를 조금 더 반영해서, 전체를 아우르는 한줄평 하나로 합쳐줘.
+    반드시 아래 JSON 형식으로만 응답해 (다른 말 금지):
+    {{
+        "summary": "한줄평 내용"
+    }}
+    """
+    response = client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.5,
+        response_format={"type": "json_object"}
+    )
+    summary = json.loads(response.choices[0].message.content)["summary"]
+    tokens = response.usage.total_tokens if response.usage else 0
+    return summary, tokens
+
+# 분석 실패 시 그래프가 깨지지 않도록 쓰는 기본값 (error 표시가 있는 결과는 캐시에 저장하지 않음)
+ANALYSIS_FALLBACK = {"scores": [5,5,5,5,5], "summary": "분석에 실패했습니다. (AI 응답 오류)", "error": True}
+
+def get_review_analysis(rest_name, reviews_text):
+    """
+    [기능 2] 리뷰 텍스트를 분석하여 5각형 그래프용 점수와 요약 반환
+    (한 번의 호출 - 긴 리뷰는 review_analysis.analyze_restaurant 의 청크 분석 사용)
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5, # 분석 일관성을 위해 낮게 설정
-            response_format={"type": "json_object"} # JSON 모드 활성화 (안정성 UP)
-        )
-        return json.loads(response.choices[0].message.content)
+        result, _ = analyze_reviews_raw(rest_name, reviews_text)
+        return result
     except Exception as e:
         # 에러 발생 시 그래프가 깨지지 않도록 기본값 반환
         print(f"리뷰 분석 에러: {e}")
-        return {"scores": [5,5,5,5,5], "summary": "분석에 실패했습니다. (AI 응답 오류)"}
\ No newline at end of file
+        return dict(ANALYSIS_FALLBACK)
\ No newline at end of file
@@ -0,0 +1,445 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from db_pool import get_pool
+
+# =============================================================================
+# 리뷰 분석 결과 캐시
+# - (식당 id, 리뷰 집합 해시) 기준으로 review_analysis_cache 테이블에 저장합니다.
+# - 리뷰가 바뀌지 않았으면 OpenAI를 다시 부르지 않고 저장된 결과를 돌려줍니다.
+# - 분석 실패(기본값 응답)는 저장하지 않습니다.
+# =============================================================================
+
+_stats = {"hits": 0, "misses": 0, "failures": 0}
+_stats_lock = threading.Lock()
+
+# 프로세스 메모리 캐시: (restaurant_id, review_hash) -> 결과 dict
+_memory = {}
+_memory_lock = threading.Lock()
+
+
+def _bump(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def get_cache_stats():
+    """캐시 적중/미스/실패 횟수 (프로세스 기준)"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def review_set_hash(reviews_df):
+    """
+    리뷰 집합의 해시. 리뷰 id와 내용이 같으면 순서와 상관없이 같은 값이 나옵니다.
+    reviews_df에는 review_id, comment 컬럼이 있어야 합니다.
+    """
+    pairs = sorted(
+        (str(rid), "" if pd.isna(comment) else str(comment))
+        for rid, comment in reviews_df[["review_id", "comment"]].itertuples(index=False, name=None)
+    )
+    return hashlib.sha1(json.dumps(pairs, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def reviews_text_of(reviews_df):
+    """분석에 보낼 리뷰 텍스트 (비어 있는 리뷰 제외)"""
+    return " ".join(reviews_df["comment"].dropna().astype(str).tolist())
+
+
+# -----------------------------------------------------------------------------
+# review_analysis_cache 테이블
+# -----------------------------------------------------------------------------
+def load_result(rest_id, review_hash):
+    """저장된 분석 결과 (없으면 None)"""
+    key = (str(rest_id), review_hash)
+    with _memory_lock:
+        if key in _memory:
+            return _memory[key]
+
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT scores, summary FROM review_analysis_cache
+                    WHERE restaurant_id = %s AND review_hash = %s
+                    """,
+                    key,
+                )
+                row = cursor.fetchone()
+    except Exception as e:
+        print(f"리뷰 분석 캐시 조회 실패: {e}")
+        return None
+
+    if row is None:
+        return None
+    result = {"scores": json.loads(row[0]), "summary": row[1]}
+    with _memory_lock:
+        _memory[key] = result
+    return result
+
+
+def store_result(rest_id, review_hash, result, review_count):
+    """분석 결과 저장 (실패 응답은 저장하지 않음)"""
+    if not result or result.get("error"):
+        return False
+    key = (str(rest_id), review_hash)
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO review_analysis_cache
+                        (restaurant_id, review_hash, scores, summary, review_count)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        scores = VALUES(scores), summary = VALUES(summary),
+                        review_count = VALUES(review_count), analyzed_at = NOW()
+                    """,
+                    (*key, json.dumps(result["scores"]), result["summary"], int(review_count)),
+                )
+    except Exception as e:
+        print(f"리뷰 분석 캐시 저장 실패: {e}")
+        return False
+
+    with _memory_lock:
+        _memory[key] = {"scores": result["scores"], "summary": result["summary"]}
+    return True
+
+
+def load_latest_result(rest_id):
+    """리뷰 집합과 상관없이 가장 최근에 저장된 분석 결과 (없으면 None)"""
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT scores, summary, analyzed_at FROM review_analysis_cache
+                    WHERE restaurant_id = %s
+                    ORDER BY analyzed_at DESC LIMIT 1
+                    """,
+                    (str(rest_id),),
+                )
+                row = cursor.fetchone()
+    except Exception as e:
+        print(f"리뷰 분석 캐시 조회 실패: {e}")
+        return None
+    if row is None:
+        return None
+    return {"scores": json.loads(row[0]), "summary": row[1], "analyzed_at": row[2]}
+
+
+# -----------------------------------------------------------------------------
+# 청크 단위 분석 (map-reduce)
+# - 리뷰를 오래된 순으로 토큰 상한까지 묶어 청크로 나눕니다.
+#   새 리뷰는 항상 마지막 청크에 붙으므로 앞쪽 청크는 캐시가 그대로 적중합니다.
+# - 청크별 점수는 리뷰 수로 가중 평균하고, 한줄평은 한 번 더 합칩니다.
+# -----------------------------------------------------------------------------
+CHUNK_TOKEN_LIMIT = 1500   # 청크 하나에 넣을 리뷰 토큰 상한 (추정치)
+CHUNK_WORKERS = 4
+
+# 화면(탭 2)에서 바로 분석할 때 쓰는 청크 풀. 일괄 분석(run_batch)은 workers 수에 맞춘 풀을 따로 만듭니다.
+_chunk_executor = ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="review-chunk")
+
+
+def estimate_tokens(text):
+    """토큰 수 추정 (한글은 대략 글자당 1토큰 이상이라 글자 수로 보수적으로 계산)"""
+    return len(text)
+
+
+def chunk_reviews(reviews_df, limit=CHUNK_TOKEN_LIMIT):
+    """
+    리뷰를 오래된 순으로 정렬해 토큰 상한 이하의 청크로 나눕니다.
+    리뷰 하나가 상한보다 길면 그 리뷰만 상한 길이로 자릅니다.
+
+    Returns:
+        list[list[str]]: 청크별 리뷰 내용 목록
+    """
+    df = reviews_df.dropna(subset=["comment"])
+    sort_cols = [c for c in ("timestamp", "review_id") if c in df.columns]
+    if sort_cols:
+        df = df.sort_values(sort_cols, kind="stable")
+
+    chunks, current, used = [], [], 0
+    for comment in df["comment"].astype(str):
+        comment = comment.strip()[:limit]
+        if not comment:
+            continue
+        cost = estimate_tokens(comment) + 1
+        if current and used + cost > limit:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(comment)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _chunk_hash(rest_name, comments):
+    payload = json.dumps([str(rest_name), comments], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _load_chunk(chunk_hash):
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT scores, summary FROM review_chunk_cache WHERE chunk_hash = %s",
+                    (chunk_hash,),
+                )
+                row = cursor.fetchone()
+    except Exception as e:
+        print(f"리뷰 청크 캐시 조회 실패: {e}")
+        return None
+    if row is None:
+        return None
+    return {"scores": json.loads(row[0]), "summary": row[1]}
+
+
+def _store_chunk(chunk_hash, result, review_count, tokens):
+    try:
+        with get_pool().connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    INSERT INTO review_chunk_cache (chunk_hash, scores, summary, review_count, tokens)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE
+                        scores = VALUES(scores), summary = VALUES(summary), tokens = VALUES(tokens)
+                    """,
+                    (chunk_hash, json.dumps(result["scores"]), result["summary"], review_count, tokens),
+                )
+    except Exception as e:
+        print(f"리뷰 청크 캐시 저장 실패: {e}")
+
+
+def _score_chunk(rest_name, comments):
+    """(결과, 토큰 수) - 캐시에 있으면 API 호출 없이 토큰 0"""
+    import recommend
+
+    chunk_hash = _chunk_hash(rest_name, comments)
+    cached = _load_chunk(chunk_hash)
+    if cached is not None:
+        return cached, 0
+    result, tokens = recommend.analyze_reviews_raw(rest_name, " ".join(comments))
+    _store_chunk(chunk_hash, result, len(comments), tokens)
+    return result, tokens
+
+
+def merge_chunk_scores(parts):
+    """[(점수 리스트, 가중치)] -> 가중 평균 점수 (소수 첫째 자리)"""
+    total = sum(weight for _, weight in parts) or 1
+    merged = [0.0] * 5
+    for scores, weight in parts:
+        for i, score in enumerate(scores[:5]):
+            merged[i] += float(score) * weight
+    return [round(v / total, 1) for v in merged]
+
+
+def analyze_reviews_chunked(rest_name, reviews_df, executor=None):
+    """
+    리뷰 전체를 청크로 나눠 병렬로 분석한 뒤 합칩니다 (실패하면 예외).
+
+    Args:
+        executor: 청크를 분석할 스레드 풀 (없으면 모듈 공용 풀)
+
+    Returns:
+        (dict, int): (분석 결과, 이번에 사용한 토큰 수)
+    """
+    import recommend
+
+    chunks = chunk_reviews(reviews_df)
+    if not chunks:
+        raise ValueError("분석할 리뷰 내용이 없습니다.")
+
+    executor = executor or _chunk_executor
+    futures = [executor.submit(_score_chunk, rest_name, comments) for comments in chunks]
+    outcomes = [f.result() for f in futures]  # 청크 하나라도 실패하면 예외가 그대로 올라감
+    tokens = sum(t for _, t in outcomes)
+
+    if len(outcomes) == 1:
+        result = outcomes[0][0]
+        return {"scores": result["scores"], "summary": result["summary"]}, tokens
+
+    scores = merge_chunk_scores(
+        [(result["scores"], len(comments)) for (result, _), comments in zip(outcomes, chunks)]
+    )
+    summary, reduce_tokens = recommend.merge_review_summaries(rest_name, [r["summary"] for r, _ in outcomes])
+    return {"scores": scores, "summary": summary}, tokens + reduce_tokens
+
+
+# -----------------------------------------------------------------------------
+# 공개 함수
+# -----------------------------------------------------------------------------
+def analyze_restaurant(rest_id, rest_name, reviews_df):
+    """
+    식당 리뷰 분석. 같은 리뷰 집합으로 분석한 적이 있으면 저장된 결과를 씁니다.
+    새로 분석할 때는 리뷰 전체를 청크로 나눠 분석합니다 (앞쪽 청크는 캐시 재사용).
+
+    Returns:
+        (dict | None, bool): (분석 결과 - 리뷰 텍스트가 없으면 None, 캐시 적중 여부)
+    """
+    import recommend
+
+    reviews_text = reviews_text_of(reviews_df)
+    if not reviews_text.strip():
+        return None, False
+
+    review_hash = review_set_hash(reviews_df)
+    cached = load_result(rest_id, review_hash)
+    if cached is not None:
+        _bump("hits")
+        return cached, True
+
+    _bump("misses")
+    try:
+        result, _ = analyze_reviews_chunked(rest_name, reviews_df)
+    except Exception as e:
+        print(f"리뷰 분석 에러: {e}")
+        _bump("failures")
+        return dict(recommend.ANALYSIS_FALLBACK), False
+    store_result(rest_id, review_hash, result, len(reviews_df))
+    return result, False
+
+
+def get_precomputed(rest_id, reviews_df):
+    """
+    미리 계산된 분석 결과만 조회합니다 (OpenAI 호출 없음).
+
+    Returns:
+        (dict | None, bool): (결과, 현재 리뷰 집합 기준인지)
+        현재 리뷰 기준 결과가 없으면 가장 최근 결과를 돌려주고 두 번째 값은 False
+    """
+    if reviews_df.empty:
+        return None, False
+    cached = load_result(rest_id, review_set_hash(reviews_df))
+    if cached is not None:
+        _bump("hits")
+        return cached, True
+    return load_latest_result(rest_id), False
+
+
+# =============================================================================
+# 일괄 분석 (manage.py analyze-reviews)
+# - 리뷰 집합이 바뀐 식당만 골라 제한된 개수의 스레드로 동시에 분석합니다.
+# - 일시적인 오류는 지수 백오프로 재시도합니다.
+# =============================================================================
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+RETRY_BASE_DELAY = 2.0  # 초 (2, 4, 8 ... + 지터)
+
+
+def load_all_reviews():
+    """전체 리뷰 (식당 id/이름 포함) - 한 번의 쿼리"""
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT r.id AS restaurant_id, r.name AS restaurant_name,
+                       mr.id AS review_id, mr.comment, mr.timestamp
+                FROM menu_reviews mr
+                JOIN menu_items mi ON mr.menu_item_id = mi.id
+                JOIN restaurants r ON mi.restaurant_id = r.id
+                ORDER BY mr.timestamp DESC
+                """
+            )
+            rows = cursor.fetchall()
+    return pd.DataFrame(rows, columns=["restaurant_id", "restaurant_name", "review_id", "comment", "timestamp"])
+
+
+def find_stale_restaurants():
+    """
+    리뷰 집합이 마지막 분석 이후 바뀐(또는 분석한 적 없는) 식당 목록
+
+    Returns:
+        list[dict]: restaurant_id, restaurant_name, review_hash, reviews(DataFrame)
+    """
+    reviews = load_all_reviews()
+    with get_pool().connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT restaurant_id, review_hash FROM review_analysis_cache")
+            analyzed = set(cursor.fetchall())
+
+    stale = []
+    for (rest_id, rest_name), group in reviews.groupby(["restaurant_id", "restaurant_name"], sort=False):
+        if not reviews_text_of(group).strip():
+            continue
+        review_hash = review_set_hash(group)
+        if (rest_id, review_hash) in analyzed:
+            continue
+        stale.append({"restaurant_id": rest_id, "restaurant_name": rest_name,
+                      "review_hash": review_hash, "reviews": group})
+    return stale
+
+
+def _analyze_with_retry(job, max_retries, executor=None):
+    """
+    (결과, 토큰 수, 시도 횟수) - 재시도를 모두 실패하면 마지막 예외를 올림
+    성공한 청크는 캐시에 남으므로 재시도 때는 실패한 청크만 다시 분석합니다.
+    """
+    for attempt in range(1, max_retries + 1):
+        try:
+            result, tokens = analyze_reviews_chunked(job["restaurant_name"], job["reviews"], executor)
+            return result, tokens, attempt
+        except Exception:
+            if attempt == max_retries:
+                raise
+            time.sleep(RETRY_BASE_DELAY * (2 ** (attempt - 1)) + random.uniform(0, 1))
+
+
+def run_batch(workers=DEFAULT_WORKERS, dry_run=False, max_retries=DEFAULT_MAX_RETRIES, limit=None, log=print):
+    """
+    바뀐 식당을 모두 분석해서 저장합니다.
+    청크 분석 풀도 workers 크기로 따로 만들어, --workers만큼 OpenAI 호출이 동시에 나가도록 합니다
+    (식당 스레드는 자기 청크가 끝나기를 기다리기만 하므로 청크 풀이 실제 동시 호출 수를 정함).
+
+    Returns:
+        dict: 처리량 리포트 (targets, succeeded, failed, retries, tokens, elapsed_s, per_min)
+    """
+    jobs = find_stale_restaurants()
+    if limit:
+        jobs = jobs[:limit]
+
+    report = {"targets": len(jobs), "succeeded": 0, "failed": 0, "retries": 0,
+              "tokens": 0, "elapsed_s": 0.0, "per_min": 0.0, "dry_run": dry_run}
+    if dry_run:
+        for job in jobs:
+            log(f"  - {job['restaurant_name']} (리뷰 {len(job['reviews'])}개)")
+        return report
+
+    started = time.perf_counter()
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="review-chunk-batch") as chunk_pool, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix="review-analysis") as pool:
+        futures = {pool.submit(_analyze_with_retry, job, max_retries, chunk_pool): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result, tokens, attempts = future.result()
+            except Exception as e:
+                report["failed"] += 1
+                log(f"  ❌ {job['restaurant_name']}: {e}")
+                continue
+
+            report["retries"] += attempts - 1
+            report["tokens"] += tokens
+            if store_result(job["restaurant_id"], job["review_hash"], result, len(job["reviews"])):
+                report["succeeded"] += 1
+                log(f"  ✅ {job['restaurant_name']} ({tokens} tokens)")
+            else:
+                report["failed"] += 1
+                log(f"  ❌ {job['restaurant_name']}: 결과 저장 실패")
+
+    report["elapsed_s"] = time.perf_counter() - started
+    if report["elapsed_s"] > 0:
+        report["per_min"] = report["succeeded"] / report["elapsed_s"] * 60
+    return report
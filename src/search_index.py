@@ -0,0 +1,175 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+# =============================================================================
+# 맛집 / 메뉴 / 리뷰 통합 검색 (프로세스 메모리 역색인)
+# - 한국어는 띄어쓰기 단위가 일정하지 않아 단어 대신 글자 2-gram(바이그램)으로 색인합니다.
+#   예) "돈까스정식" -> 돈까, 까스, 스정, 정식
+# - 조인 캐시가 새 행을 합칠 때마다 그 행만 추가로 색인합니다.
+# =============================================================================
+
+# 문서 종류별 가중치 (맛집 이름 > 메뉴 이름 > 리뷰)
+FIELD_WEIGHTS = {"restaurant": 3.0, "menu": 2.0, "review": 1.0}
+PHRASE_BONUS = 2.0  # 검색어가 그대로 들어 있으면 추가 점수
+DEFAULT_LIMIT = 20
+
+_token_split = re.compile(r"[^0-9a-z가-힣]+")
+
+
+def tokenize(text):
+    """소문자/한글/숫자만 남기고 단어별 2-gram (한 글자 단어는 그대로) 목록"""
+    tokens = []
+    for word in _token_split.split(str(text or "").lower()):
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def _query_tokens(query):
+    """
+    검색어 토큰. 한 글자 단어는 그 글자로 시작하는 바이그램을 모두 찾아야 하므로 따로 표시합니다.
+    Returns: (바이그램 목록, 한 글자 목록)
+    """
+    grams, singles = [], []
+    for word in _token_split.split(str(query or "").lower()):
+        if len(word) == 1:
+            singles.append(word)
+        elif word:
+            grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return list(dict.fromkeys(grams)), list(dict.fromkeys(singles))
+
+
+class SearchIndex:
+    """
+    문서 id -> 메타 정보, 토큰 -> {문서 id: 빈도} 역색인.
+    같은 문서 id로 다시 추가하면 내용이 바뀐 경우에만 교체합니다.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.docs = {}                     # doc_id -> dict(kind, restaurant_id, restaurant_name, text, ...)
+        self.doc_tokens = {}               # doc_id -> {token: tf}
+        self.postings = defaultdict(dict)  # token -> {doc_id: tf}
+        self.first_chars = defaultdict(set)  # 글자 -> 그 글자로 시작하는 토큰 (한 글자 검색용)
+
+    def _remove(self, doc_id):
+        for token in self.doc_tokens.pop(doc_id, {}):
+            posting = self.postings.get(token)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[token]
+        self.docs.pop(doc_id, None)
+
+    def _add(self, doc_id, meta):
+        old = self.docs.get(doc_id)
+        if old is not None and old["text"] == meta["text"]:
+            return
+        self._remove(doc_id)
+
+        tf = defaultdict(int)
+        for token in tokenize(meta["text"]):
+            tf[token] += 1
+        if not tf:
+            return
+        self.docs[doc_id] = meta
+        self.doc_tokens[doc_id] = dict(tf)
+        for token, count in tf.items():
+            self.postings[token][doc_id] = count
+            self.first_chars[token[0]].add(token)
+
+    def add_rows(self, df):
+        """
+        조인 DataFrame의 행들을 색인합니다 (맛집 이름 / 메뉴 이름 / 리뷰 내용).
+
+        Returns:
+            int: 처리한 행 수
+        """
+        if df is None or df.empty:
+            return 0
+        cols = ["restaurant_id", "restaurant_name", "category", "menu_item_id", "item_name",
+                "price", "review_id", "comment", "rating", "user_name"]
+        rows = df[cols].astype(object).where(df[cols].notna(), None)
+
+        with self.lock:
+            for r in rows.itertuples(index=False):
+                base = {"restaurant_id": r.restaurant_id, "restaurant_name": r.restaurant_name,
+                        "category": r.category}
+                if r.restaurant_name:
+                    self._add(("restaurant", r.restaurant_id), {**base, "kind": "restaurant",
+                                                                "text": str(r.restaurant_name)})
+                if r.menu_item_id is not None and r.item_name:
+                    self._add(("menu", r.menu_item_id), {**base, "kind": "menu", "text": str(r.item_name),
+                                                         "item_name": r.item_name, "price": r.price})
+                if r.review_id is not None and r.comment:
+                    self._add(("review", r.review_id), {**base, "kind": "review", "text": str(r.comment),
+                                                        "item_name": r.item_name, "rating": r.rating,
+                                                        "user_name": r.user_name})
+        return len(rows)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """
+        검색어의 모든 토큰을 포함하는 문서를 점수순으로 반환합니다.
+        점수 = Σ(tf × idf) × 문서 종류 가중치 (+ 검색어가 그대로 들어 있으면 보너스)
+
+        Returns:
+            list[dict]: 문서 메타 정보 + score
+        """
+        grams, singles = _query_tokens(query)
+        if not grams and not singles:
+            return []
+        phrase = " ".join(_token_split.split(str(query).lower())).strip()
+
+        with self.lock:
+            n_docs = len(self.docs) or 1
+            candidates = None
+            token_groups = [[g] for g in grams]
+            token_groups += [sorted(self.first_chars.get(c, set()) | {c}) for c in singles]
+
+            for group in token_groups:
+                matched = set()
+                for token in group:
+                    matched.update(self.postings.get(token, {}))
+                candidates = matched if candidates is None else candidates & matched
+                if not candidates:
+                    return []
+
+            hits = []
+            for doc_id in candidates:
+                meta = self.docs[doc_id]
+                tokens = self.doc_tokens[doc_id]
+                score = 0.0
+                for group in token_groups:
+                    for token in group:
+                        tf = tokens.get(token)
+                        if tf:
+                            idf = math.log(1 + n_docs / len(self.postings[token]))
+                            score += tf * idf
+                score *= FIELD_WEIGHTS[meta["kind"]]
+                if phrase and phrase in meta["text"].lower():
+                    score += PHRASE_BONUS * FIELD_WEIGHTS[meta["kind"]]
+                hits.append({**meta, "score": round(score, 3)})
+
+        hits.sort(key=lambda h: h["score"], reverse=True)
+        return hits[:limit]
+
+
+def build_index(df):
+    index = SearchIndex()
+    index.add_rows(df)
+    return index
+
+
+def hits_to_frame(hits):
+    """검색 결과를 화면 표시용 DataFrame으로"""
+    kind_labels = {"restaurant": "맛집", "menu": "메뉴", "review": "리뷰"}
+    return pd.DataFrame(
+        [{"종류": kind_labels[h["kind"]], "맛집": h["restaurant_name"], "카테고리": h.get("category"),
+          "메뉴": h.get("item_name"), "내용": h["text"], "점수": h["score"]} for h in hits]
+    )
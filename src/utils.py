@@ -1,8 +1,26 @@
 # 민석 수정
 import uuid
+import streamlit as st
 from geopy.geocoders import Nominatim
 
+def _sql_backend_configured():
+    """secrets에 [connections.mysql]이 있으면 SQL 백엔드(공유 지오코딩 캐시 사용 가능)"""
+    try:
+        return "mysql" in st.secrets.get("connections", {})
+    except Exception:
+        return False
+
 def get_coords(address):
+    """주소 -> (lat, lon). 못 찾으면 (None, None)"""
+    if _sql_backend_configured():
+        # SQL 백엔드에서는 geocode_cache + 호출 속도 제한을 거침
+        import geocoding
+        coords = geocoding.geocode(address)
+        if coords:
+            return coords
+        return None, None
+
+    # 시트 전용 배포: geocode_cache 테이블이 없으므로 Nominatim을 바로 호출
     try:
         geolocator = Nominatim(user_agent=f"my_class_app_{uuid.uuid4().hex[:6]}")
         location = geolocator.geocode(address)
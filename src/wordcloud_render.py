@@ -0,0 +1,99 @@
+import io
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# =============================================================================
+# 워드클라우드 렌더링 (별도 프로세스)
+# - CPU를 많이 쓰는 WordCloud 생성을 프로세스 풀에서 실행해 Streamlit 스크립트 스레드(GIL)를 막지 않습니다.
+# - 결과(PNG 바이트 + 핵심 키워드)는 리뷰 집합 해시 기준으로 캐시합니다.
+# - 같은 리뷰 집합을 여러 세션이 동시에 요청하면 한 번만 렌더링합니다.
+# =============================================================================
+
+MAX_WORKERS = 2
+CACHE_SIZE = 128
+RENDER_TIMEOUT = 30  # 초
+CLOUD_SIZE = 300
+TOP_KEYWORDS = 3
+
+_pool = None
+_lock = threading.Lock()
+_cache = OrderedDict()  # review_hash -> (png_bytes, keywords)
+_inflight = {}          # review_hash -> Future
+
+
+def render_wordcloud(text, font_path):
+    """
+    (프로세스 풀에서 실행) 원형 워드클라우드 PNG 바이트와 핵심 키워드 목록을 만듭니다.
+    """
+    import numpy as np
+    from wordcloud import WordCloud
+
+    x, y = np.ogrid[:CLOUD_SIZE, :CLOUD_SIZE]
+    center, radius = CLOUD_SIZE // 2, CLOUD_SIZE // 2 - 20
+    mask = 255 * ((x - center) ** 2 + (y - center) ** 2 > radius ** 2).astype(int)
+
+    wc = WordCloud(
+        font_path=font_path,
+        background_color="white",
+        mask=mask,
+        width=CLOUD_SIZE,
+        height=CLOUD_SIZE,
+        max_font_size=80,
+        prefer_horizontal=0.8,
+        collocations=False,
+    ).generate(text)
+
+    buf = io.BytesIO()
+    wc.to_image().save(buf, format="PNG")
+    keywords = [k for k, _ in sorted(wc.words_.items(), key=lambda t: t[1], reverse=True)[:TOP_KEYWORDS]]
+    return buf.getvalue(), keywords
+
+
+def _get_pool():
+    """프로세스 전체에서 공유하는 프로세스 풀 (spawn: 부모의 스레드/락 상태를 물려받지 않음)"""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _finish(review_hash, future):
+    with _lock:
+        _inflight.pop(review_hash, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        _cache[review_hash] = future.result()
+        _cache.move_to_end(review_hash)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def get_wordcloud(review_hash, text, font_path, timeout=RENDER_TIMEOUT):
+    """
+    리뷰 집합의 워드클라우드.
+
+    Returns:
+        (bytes, list[str]): (PNG 바이트, 핵심 키워드) - 캐시에 있으면 바로 반환
+    """
+    global _pool
+    with _lock:
+        if review_hash in _cache:
+            _cache.move_to_end(review_hash)
+            return _cache[review_hash]
+        future = _inflight.get(review_hash)
+        submitted = future is None
+        if submitted:
+            try:
+                future = _get_pool().submit(render_wordcloud, text, font_path)
+            except RuntimeError:
+                # 자식 프로세스가 죽어 풀이 깨졌으면 새로 만듦
+                _pool = None
+                future = _get_pool().submit(render_wordcloud, text, font_path)
+            _inflight[review_hash] = future
+
+    if submitted:
+        # 이미 끝난 future면 콜백이 이 자리에서 바로 실행되므로 _lock을 놓은 뒤에 등록
+        future.add_done_callback(lambda f: _finish(review_hash, f))
+    return future.result(timeout=timeout)